@@ -41,7 +41,9 @@ chrome.runtime.onMessage.addListener((msg, sender, sendResponse) => {
       }
       if (msg.type === "GET_RESULT") {
         const r = await apiFetch(`/jobs/${msg.job_id}/result`);
-        sendResponse({ ok: true, data: await r.json() });
+        // The server streams raw bytes; decode here instead of JSON+base64.
+        const text = await r.text();
+        sendResponse({ ok: true, data: { content_type: r.headers.get("Content-Type"), text } });
         return;
       }
       if (msg.type === "APPROVE") {
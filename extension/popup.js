@@ -110,15 +110,6 @@ async function getResult(jobId) {
   return r.data;
 }
 
-function decodeUTF8(base64) {
-  const binaryString = atob(base64);
-  const bytes = new Uint8Array(binaryString.length);
-  for (let i = 0; i < binaryString.length; i++) {
-    bytes[i] = binaryString.charCodeAt(i);
-  }
-  return new TextDecoder().decode(bytes);
-}
-
 function isValidTranscript(text) {
   // Filter out gibberish/low quality transcripts
   if (!text || text.length < 5) return false;
@@ -158,7 +149,7 @@ async function processAudioChunk() {
     const cycleTime = tEnd - tStart;
 
     const res = await getResult(jobId);
-    let text = decodeUTF8(res.bytes_base64);
+    let text = res.text;
 
     const match = text.match(/Transcript \(\d+s\): (.+)/);
     if (match && match[1]) {
@@ -227,7 +218,7 @@ async function analyzeText(text) {
     const jobId = await submitJob(16, { transcript: text });
     await poll(jobId);
     const res = await getResult(jobId);
-    const rawAI = decodeUTF8(res.bytes_base64);
+    const rawAI = res.text;
 
     const tEnd = Date.now();
     const aiTime = tEnd - tStart;
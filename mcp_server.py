@@ -1,6 +1,11 @@
 import os
 import asyncio
 import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 from mcp.server.models import InitializationOptions
 from mcp.server import NotificationOptions, Server
 from mcp.server.stdio import stdio_server
@@ -11,243 +16,270 @@ from server import fs_tools, extended_tools
 server = Server("coworker-mcp")
 
 # Configuration: Allowed roots can be set via environment variable (comma-separated)
-# Default to current working directory if not set
-ALLOWED_ROOTS = os.environ.get("COWORKER_ALLOWED_ROOTS", os.getcwd()).split(",")
+# Default to current working directory if not set.
+# Resolved via realpath once at startup so per-request root checks don't
+# re-normalize each entry; the frozen tuple is passed everywhere.
+ALLOWED_ROOTS = tuple(
+    os.path.realpath(p.strip())
+    for p in os.environ.get("COWORKER_ALLOWED_ROOTS", os.getcwd()).split(",")
+    if p.strip()
+)
 
-@server.list_tools()
-async def handle_list_tools() -> list[types.Tool]:
-    """List available tools."""
-    return [
-        types.Tool(
-            name="list_files",
-            description="List files and directories in a workspace root.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "root": {"type": "string", "description": "The root directory to list."},
-                },
-                "required": ["root"],
+# The tool list is static, so build it once at import time instead of
+# reconstructing every schema dict on each tools/list request.
+_TOOLS = [
+    types.Tool(
+        name="list_files",
+        description="List files and directories in a workspace root.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "root": {"type": "string", "description": "The root directory to list."},
             },
-        ),
-        types.Tool(
-            name="read_file",
-            description="Read the contents of a file (safety capped at 1MB).",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "path": {"type": "string", "description": "The path to the file to read."},
-                },
-                "required": ["path"],
+            "required": ["root"],
+        },
+    ),
+    types.Tool(
+        name="read_file",
+        description="Read the contents of a file (safety capped at 1MB).",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "path": {"type": "string", "description": "The path to the file to read."},
             },
-        ),
-        types.Tool(
-            name="browse_web",
-            description="Fetch text content from a URL (web browsing).",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "url": {"type": "string", "description": "The URL to browse."},
-                },
-                "required": ["url"],
+            "required": ["path"],
+        },
+    ),
+    types.Tool(
+        name="browse_web",
+        description="Fetch text content from a URL (web browsing).",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "url": {"type": "string", "description": "The URL to browse."},
             },
-        ),
-        types.Tool(
-            name="create_excel",
-            description="Create an Excel file (.xlsx) with provided data.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "path": {"type": "string", "description": "Destination path for the .xlsx file."},
-                    "data": {
-                        "type": "array",
-                        "items": {"type": "object"},
-                        "description": "List of rows (dictionaries) to write."
-                    },
+            "required": ["url"],
+        },
+    ),
+    types.Tool(
+        name="create_excel",
+        description="Create an Excel file (.xlsx) with provided data.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "path": {"type": "string", "description": "Destination path for the .xlsx file."},
+                "data": {
+                    "type": "array",
+                    "items": {"type": "object"},
+                    "description": "List of rows (dictionaries) to write."
                 },
-                "required": ["path", "data"],
             },
-        ),
-        types.Tool(
-            name="create_word",
-            description="Create a Word document (.docx) with provided content.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "path": {"type": "string", "description": "Destination path for the .docx file."},
-                    "content": {"type": "string", "description": "Text content for the document."},
-                },
-                "required": ["path", "content"],
+            "required": ["path", "data"],
+        },
+    ),
+    types.Tool(
+        name="create_word",
+        description="Create a Word document (.docx) with provided content.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "path": {"type": "string", "description": "Destination path for the .docx file."},
+                "content": {"type": "string", "description": "Text content for the document."},
             },
-        ),
-        types.Tool(
-            name="create_pdf",
-            description="Create a PDF document with provided content.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "path": {"type": "string", "description": "Destination path for the .pdf file."},
-                    "content": {"type": "string", "description": "Text content for the PDF."},
-                },
-                "required": ["path", "content"],
+            "required": ["path", "content"],
+        },
+    ),
+    types.Tool(
+        name="create_pdf",
+        description="Create a PDF document with provided content.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "path": {"type": "string", "description": "Destination path for the .pdf file."},
+                "content": {"type": "string", "description": "Text content for the PDF."},
             },
-        ),
-        types.Tool(
-            name="execute_python",
-            description="Execute Python code locally and get the result.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "code": {"type": "string", "description": "The Python code to execute."},
-                },
-                "required": ["code"],
+            "required": ["path", "content"],
+        },
+    ),
+    types.Tool(
+        name="execute_python",
+        description="Execute Python code locally and get the result.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "code": {"type": "string", "description": "The Python code to execute."},
             },
-        ),
-        types.Tool(
-            name="search_past_actions",
-            description="Search the audit logs for past filesystem activities.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "query": {"type": "string", "description": "Search term for the logs."},
-                    "workspace_root": {"type": "string", "description": "The workspace root to search in."},
-                },
-                "required": ["query", "workspace_root"],
+            "required": ["code"],
+        },
+    ),
+    types.Tool(
+        name="search_past_actions",
+        description="Search the audit logs for past filesystem activities.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "query": {"type": "string", "description": "Search term for the logs."},
+                "workspace_root": {"type": "string", "description": "The workspace root to search in."},
             },
-        ),
-        types.Tool(
-            name="search_google_drive",
-            description="Search files in Google Drive (requires credentials.json).",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "query": {"type": "string", "description": "Search term for Drive."},
-                },
-                "required": ["query"],
+            "required": ["query", "workspace_root"],
+        },
+    ),
+    types.Tool(
+        name="search_google_drive",
+        description="Search files in Google Drive (requires credentials.json).",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "query": {"type": "string", "description": "Search term for Drive."},
             },
-        ),
-        types.Tool(
-            name="organize_plan",
-            description="Propose a plan to organize files (e.g., by extension).",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "root": {"type": "string", "description": "The root directory to organize."},
-                    "policy": {"type": "string", "description": "Organization policy (default: 'by_ext')."},
-                },
-                "required": ["root"],
+            "required": ["query"],
+        },
+    ),
+    types.Tool(
+        name="organize_plan",
+        description="Propose a plan to organize files (e.g., by extension).",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "root": {"type": "string", "description": "The root directory to organize."},
+                "policy": {"type": "string", "description": "Organization policy (default: 'by_ext')."},
             },
-        ),
-        types.Tool(
-            name="listen_to_meeting",
-            description="Listen to the microphone for a set duration and transcribe the speech.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "duration_seconds": {"type": "integer", "description": "How long to record (default: 10)."},
-                },
+            "required": ["root"],
+        },
+    ),
+    types.Tool(
+        name="listen_to_meeting",
+        description="Listen to the microphone for a set duration and transcribe the speech.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "duration_seconds": {"type": "integer", "description": "How long to record (default: 10)."},
             },
-        ),
-        types.Tool(
-            name="execute_plan",
-            description="Execute a pre-generated plan. WARNING: Real filesystem changes.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "plan": {"type": "object", "description": "The plan object (from organize_plan)."},
-                    "workspace_root": {"type": "string", "description": "The root directory for the workspace."},
-                },
-                "required": ["plan", "workspace_root"],
+        },
+    ),
+    types.Tool(
+        name="execute_plan",
+        description="Execute a pre-generated plan. WARNING: Real filesystem changes.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "plan": {"type": "object", "description": "The plan object (from organize_plan)."},
+                "workspace_root": {"type": "string", "description": "The root directory for the workspace."},
             },
-        ),
-    ]
+            "required": ["plan", "workspace_root"],
+        },
+    ),
+]
 
-@server.call_tool()
-async def handle_call_tool(
-    name: str, arguments: dict | None
-) -> list[types.TextContent | types.ImageContent | types.EmbeddedResource]:
-    """Handle tool calls."""
-    if not arguments:
-        return [types.TextContent(type="text", text="Missing arguments")]
+@server.list_tools()
+async def handle_list_tools() -> list[types.Tool]:
+    """List available tools."""
+    # Shallow copy so callers can't mutate the cached list.
+    return list(_TOOLS)
 
-    try:
-        # Standard FS Tools
-        if name == "list_files":
-            root = arguments.get("root")
-            res = fs_tools.list_files(root, ALLOWED_ROOTS)
-            return [types.TextContent(type="text", text=str(res))]
+def _h_list_files(args):
+    return fs_tools.list_files(args.get("root"), ALLOWED_ROOTS)
+
+def _h_read_file(args):
+    return fs_tools.read_file_safe(args.get("path"), ALLOWED_ROOTS)
 
-        elif name == "read_file":
-            path = arguments.get("path")
-            res = fs_tools.read_file_safe(path, ALLOWED_ROOTS)
-            return [types.TextContent(type="text", text=str(res))]
+def _h_browse_web(args):
+    return extended_tools.browse_web(args.get("url"))
 
-        # Extended Tools
-        elif name == "browse_web":
-            url = arguments.get("url")
-            res = extended_tools.browse_web(url)
-            return [types.TextContent(type="text", text=res)]
+def _h_create_excel(args):
+    path = args.get("path")
+    # Enforce root safety for writes
+    fs_tools.enforce_within_roots(path, ALLOWED_ROOTS)
+    return extended_tools.create_excel(path, args.get("data"))
 
-        elif name == "create_excel":
-            path = arguments.get("path")
-            data = arguments.get("data")
-            # Enforce root safety for writes
-            fs_tools.enforce_within_roots(path, ALLOWED_ROOTS)
-            res = extended_tools.create_excel(path, data)
-            return [types.TextContent(type="text", text=res)]
+def _h_create_word(args):
+    path = args.get("path")
+    fs_tools.enforce_within_roots(path, ALLOWED_ROOTS)
+    return extended_tools.create_word(path, args.get("content"))
 
-        elif name == "create_word":
-            path = arguments.get("path")
-            content = arguments.get("content")
-            fs_tools.enforce_within_roots(path, ALLOWED_ROOTS)
-            res = extended_tools.create_word(path, content)
-            return [types.TextContent(type="text", text=res)]
+def _h_create_pdf(args):
+    path = args.get("path")
+    fs_tools.enforce_within_roots(path, ALLOWED_ROOTS)
+    return extended_tools.create_pdf(path, args.get("content"))
 
-        elif name == "create_pdf":
-            path = arguments.get("path")
-            content = arguments.get("content")
-            fs_tools.enforce_within_roots(path, ALLOWED_ROOTS)
-            res = extended_tools.create_pdf(path, content)
-            return [types.TextContent(type="text", text=res)]
+def _h_execute_python(args):
+    return extended_tools.execute_python_code(args.get("code"))
 
-        elif name == "execute_python":
-            code = arguments.get("code")
-            res = extended_tools.execute_python_code(code)
-            return [types.TextContent(type="text", text=res)]
+def _h_search_past_actions(args):
+    return extended_tools.search_audit_logs(args.get("query"), args.get("workspace_root"))
 
-        elif name == "search_past_actions":
-            query = arguments.get("query")
-            workspace_root = arguments.get("workspace_root")
-            res = extended_tools.search_audit_logs(query, workspace_root)
-            return [types.TextContent(type="text", text=res)]
+def _h_search_google_drive(args):
+    return extended_tools.search_google_drive(args.get("query"))
 
-        elif name == "search_google_drive":
-            query = arguments.get("query")
-            res = extended_tools.search_google_drive(query)
-            return [types.TextContent(type="text", text=res)]
+def _h_listen_to_meeting(args):
+    return extended_tools.record_and_transcribe(duration=args.get("duration_seconds", 10))
 
-        elif name == "listen_to_meeting":
-            duration = arguments.get("duration_seconds", 10)
-            res = extended_tools.record_and_transcribe(duration=duration)
-            return [types.TextContent(type="text", text=res)]
+def _h_organize_plan(args):
+    return fs_tools.propose_organize_plan(args.get("root"), ALLOWED_ROOTS, policy=args.get("policy", "by_ext"))
 
-        elif name == "organize_plan":
-            root = arguments.get("root")
-            policy = arguments.get("policy", "by_ext")
-            res = fs_tools.propose_organize_plan(root, ALLOWED_ROOTS, policy=policy)
-            return [types.TextContent(type="text", text=str(res))]
+def _h_execute_plan(args):
+    return fs_tools.execute_plan(args.get("plan"), ALLOWED_ROOTS, args.get("workspace_root"))
 
-        elif name == "execute_plan":
-            plan = arguments.get("plan")
-            workspace_root = arguments.get("workspace_root")
-            res = fs_tools.execute_plan(plan, ALLOWED_ROOTS, workspace_root)
-            return [types.TextContent(type="text", text=str(res))]
+def _text(res) -> types.TextContent:
+    """Wrap a tool result as TextContent.
 
-        else:
-            return [types.TextContent(type="text", text=f"Unknown tool: {name}")]
+    Structured results are serialized as JSON: str() on a dict produces
+    Python repr (single quotes), which clients can't parse, and re-reprs
+    the whole structure in the interpreter on every call.
+    """
+    if not isinstance(res, str):
+        res = orjson.dumps(res).decode() if orjson is not None else json.dumps(res)
+    return types.TextContent(type="text", text=res)
 
+
+# Bound concurrent tool executions so a burst of calls can't saturate the
+# thread pool or queue up unbounded directory walks in memory.
+MAX_CONCURRENCY = int(os.environ.get("COWORKER_MAX_CONCURRENCY", "8"))
+_TOOL_SEM = asyncio.Semaphore(MAX_CONCURRENCY)
+
+# Tool name -> handler; a single dict lookup instead of a chain of string compares.
+DISPATCH = {
+    "list_files": _h_list_files,
+    "read_file": _h_read_file,
+    "browse_web": _h_browse_web,
+    "create_excel": _h_create_excel,
+    "create_word": _h_create_word,
+    "create_pdf": _h_create_pdf,
+    "execute_python": _h_execute_python,
+    "search_past_actions": _h_search_past_actions,
+    "search_google_drive": _h_search_google_drive,
+    "listen_to_meeting": _h_listen_to_meeting,
+    "organize_plan": _h_organize_plan,
+    "execute_plan": _h_execute_plan,
+}
+
+@server.call_tool()
+async def handle_call_tool(
+    name: str, arguments: dict | None
+) -> list[types.TextContent | types.ImageContent | types.EmbeddedResource]:
+    """Handle tool calls."""
+    if not arguments:
+        return [types.TextContent(type="text", text="Missing arguments")]
+
+    handler = DISPATCH.get(name)
+    if handler is None:
+        return [types.TextContent(type="text", text=f"Unknown tool: {name}")]
+
+    try:
+        # Every handler does blocking filesystem/network/subprocess work;
+        # run it on a worker thread so the stdio event loop stays responsive.
+        # Deliberately stdlib IO + to_thread rather than aiofiles/anyio
+        # wrappers: wrapped async file IO benchmarks slower than a plain
+        # thread hop for reads like read_file_safe.
+        # The semaphore applies backpressure: excess calls queue here instead
+        # of piling onto the thread pool.
+        async with _TOOL_SEM:
+            res = await asyncio.to_thread(handler, arguments)
     except Exception as e:
         return [types.TextContent(type="text", text=f"Error: {str(e)}")]
 
+    return [_text(res)]
+
 async def main():
     async with stdio_server() as (read_stream, write_stream):
         await server.run(
@@ -264,4 +296,9 @@ async def main():
         )
 
 if __name__ == "__main__":
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass  # not available on Windows; the default loop works fine
     asyncio.run(main())
@@ -1,31 +1,104 @@
 from __future__ import annotations
 
+import asyncio
 import json
-import uuid
+import os
+import time
 import secrets
 import hashlib
-import base64
+from collections import OrderedDict
 from typing import Optional, Dict, List
 
+import orjson
 from fastapi import FastAPI, Header, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 
 from .cp_store import CPStore, QUEUED, SUCCEEDED
 from .security import mint_token, require_token
 from .worker import Worker
+from . import extended_tools
 
-app = FastAPI(title="Coworker MCP (Python)")
+app = FastAPI(title="Coworker MCP (Python)", default_response_class=ORJSONResponse)
 store = CPStore(db_path="coworker_cp.sqlite3")
 
-# For dev convenience allow all; restrict in production.
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=False,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# For dev convenience allow all; restrict in production. With a wildcard
+# origin and no credentials the CORS response headers are fully static, so
+# a thin injector replaces CORSMiddleware's per-request origin logic.
+_CORS_RAW = [
+    (b"access-control-allow-origin", b"*"),
+    (b"access-control-allow-methods", b"*"),
+    (b"access-control-allow-headers", b"*"),
+]
+_PREFLIGHT_START = {
+    "type": "http.response.start",
+    "status": 204,
+    "headers": _CORS_RAW,
+}
+_PREFLIGHT_BODY = {"type": "http.response.body", "body": b""}
+
+
+class _CORSInjector:
+    """Raw ASGI CORS injector.
+
+    @app.middleware("http") would route every request through Starlette's
+    BaseHTTPMiddleware (a per-request task group plus stream re-wrapping),
+    costing more than the CORSMiddleware it was meant to streamline. This
+    wraps send directly: preflights short-circuit with a canned 204, and
+    other responses get the static headers appended at http.response.start.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if scope["method"] == "OPTIONS":
+            await send(_PREFLIGHT_START)
+            await send(_PREFLIGHT_BODY)
+            return
+
+        async def send_with_cors(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers") or ()) + _CORS_RAW
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
+
+
+app.add_middleware(_CORSInjector)
+
+
+# Client retries with the same dedupe key are common; remember recent
+# (dedupe_key, type) -> job_id mappings so they return without touching
+# SQLite. The unique index on the jobs table remains the source of truth.
+_DEDUPE_MAX = 100_000
+_dedupe_cache: "OrderedDict[tuple, str]" = OrderedDict()
+
+
+def _new_id() -> str:
+    """Time-ordered 128-bit id.
+
+    Cheaper than uuid4 and keeps session/job primary keys monotonically
+    increasing, so SQLite B-tree inserts stay on the rightmost leaf instead
+    of splitting random pages.
+    """
+    return f"{time.time_ns():016x}{secrets.token_bytes(10).hex()}"
+
+
+# Results larger than this are streamed from the BLOB instead of fully read.
+_STREAM_THRESHOLD = 1 << 20
+
+
+def _notify_workers(job_id: str) -> None:
+    # Runs on the event loop via call_soon_threadsafe; asyncio.Queue is not
+    # thread-safe, so the sync submit_job endpoint must not touch it directly.
+    try:
+        app.state.job_queue.put_nowait(job_id)
+    except asyncio.QueueFull:
+        pass  # workers fall back to their periodic store poll
 
 
 class HandshakeResponse(BaseModel):
@@ -48,62 +121,88 @@ class ApprovePlanBody(BaseModel):
 
 @app.on_event("startup")
 async def startup() -> None:
-    import asyncio
-
-    for i in range(2):
-        w = Worker(store, worker_id=f"w{i+1}")
+    # Workers block on this queue instead of poll-sleeping against SQLite;
+    # submit_job pushes a wakeup after each insert. Sync endpoints run on
+    # threadpool threads, so the loop is captured here and wakeups are
+    # marshalled onto it with call_soon_threadsafe.
+    app.state.loop = asyncio.get_running_loop()
+    app.state.job_queue = asyncio.Queue(maxsize=1024)
+    n_workers = int(os.environ.get("COWORKER_WORKERS", os.cpu_count() or 4))
+    for i in range(n_workers):
+        w = Worker(store, worker_id=f"w{i+1}", queue=app.state.job_queue)
         asyncio.create_task(w.run_forever())
 
 
+@app.on_event("shutdown")
+async def shutdown() -> None:
+    # Release the warm outbound connections and the sqlite handles.
+    await extended_tools.aclose_clients()
+    store.close()
+
+
 @app.post("/handshake", response_model=HandshakeResponse)
 def handshake() -> HandshakeResponse:
-    session_id = str(uuid.uuid4())
+    session_id = _new_id()
     token = mint_token()
     store.create_session(session_id, token)
     return HandshakeResponse(session_id=session_id, token=token)
 
 
+# The tool catalog is static: serialize it once and let clients revalidate
+# with an ETag instead of re-building and re-encoding the dict per request.
+_TOOLS_PAYLOAD = {
+    "tools": [
+        {"name": "scan_index", "type": 1, "params": ["root", "hash_files"]},
+        {"name": "list_files", "type": 2, "params": ["root"]},
+        {"name": "read_file", "type": 3, "params": ["path", "max_bytes"]},
+        {"name": "organize_plan", "type": 4, "params": ["root", "policy"]},
+        {
+            "name": "execute_plan",
+            "type": 5,
+            "params": ["plan_job_id", "workspace_root"],
+            "requires_approval": True,
+        },
+        {
+            "name": "soft_delete",
+            "type": 6,
+            "params": ["path", "workspace_root"],
+            "requires_approval": True,
+        },
+        {
+            "name": "restore",
+            "type": 7,
+            "params": ["trash_item_path", "restore_to", "workspace_root"],
+            "requires_approval": True,
+        },
+        {"name": "browse_web", "type": 8, "params": ["url"]},
+        {"name": "create_excel", "type": 9, "params": ["path", "data"]},
+        {"name": "create_word", "type": 10, "params": ["path", "content"]},
+        {"name": "create_pdf", "type": 11, "params": ["path", "content"]},
+        {"name": "execute_python", "type": 12, "params": ["code"]},
+        {"name": "search_past_actions", "type": 13, "params": ["query", "workspace_root"]},
+        {"name": "search_google_drive", "type": 14, "params": ["query"]},
+        {"name": "listen_meeting", "type": 15, "params": ["duration"]},
+        {"name": "ai_analyze", "type": 16, "params": ["transcript"]},
+    ]
+}
+_TOOLS_JSON = json.dumps(_TOOLS_PAYLOAD, separators=(",", ":")).encode("utf-8")
+_TOOLS_ETAG = hashlib.sha256(_TOOLS_JSON).hexdigest()[:16]
+
+
 @app.get("/tools")
 def tools(
     x_coworker_session: Optional[str] = Header(default=None),
     x_coworker_token: Optional[str] = Header(default=None),
+    if_none_match: Optional[str] = Header(default=None),
 ):
     require_token(store, x_coworker_session, x_coworker_token)
-    return {
-        "tools": [
-            {"name": "scan_index", "type": 1, "params": ["root", "hash_files"]},
-            {"name": "list_files", "type": 2, "params": ["root"]},
-            {"name": "read_file", "type": 3, "params": ["path", "max_bytes"]},
-            {"name": "organize_plan", "type": 4, "params": ["root", "policy"]},
-            {
-                "name": "execute_plan",
-                "type": 5,
-                "params": ["plan_job_id", "workspace_root"],
-                "requires_approval": True,
-            },
-            {
-                "name": "soft_delete",
-                "type": 6,
-                "params": ["path", "workspace_root"],
-                "requires_approval": True,
-            },
-            {
-                "name": "restore",
-                "type": 7,
-                "params": ["trash_item_path", "restore_to", "workspace_root"],
-                "requires_approval": True,
-            },
-            {"name": "browse_web", "type": 8, "params": ["url"]},
-            {"name": "create_excel", "type": 9, "params": ["path", "data"]},
-            {"name": "create_word", "type": 10, "params": ["path", "content"]},
-            {"name": "create_pdf", "type": 11, "params": ["path", "content"]},
-            {"name": "execute_python", "type": 12, "params": ["code"]},
-            {"name": "search_past_actions", "type": 13, "params": ["query", "workspace_root"]},
-            {"name": "search_google_drive", "type": 14, "params": ["query"]},
-            {"name": "listen_meeting", "type": 15, "params": ["duration"]},
-            {"name": "ai_analyze", "type": 16, "params": ["transcript"]},
-        ]
-    }
+    if if_none_match == _TOOLS_ETAG:
+        return Response(status_code=304)
+    return Response(
+        content=_TOOLS_JSON,
+        media_type="application/json",
+        headers={"ETag": _TOOLS_ETAG, "Cache-Control": "private, max-age=300"},
+    )
 
 
 @app.post("/approve")
@@ -113,7 +212,6 @@ def approve_plan(
     x_coworker_token: Optional[str] = Header(default=None),
 ):
     require_token(store, x_coworker_session, x_coworker_token)
-    store.purge_expired_approvals()
 
     plan_job = store.get_job(body.plan_job_id)
     if not plan_job:
@@ -121,20 +219,29 @@ def approve_plan(
     if int(plan_job["status"]) != SUCCEEDED:
         raise HTTPException(status_code=400, detail="Plan job is not in SUCCEEDED state")
 
-    plan_res = store.get_result(body.plan_job_id)
-    if not plan_res:
-        raise HTTPException(status_code=404, detail="Plan result not found")
-
-    plan_json = json.loads(plan_res[0].decode("utf-8"))
-    plan_hash = plan_json.get("plan_hash")
+    # Fast path: the worker stores the plan hash next to the result, so
+    # approval needs no JSON parse at all.
+    plan_hash = store.get_plan_hash(body.plan_job_id)
     if not plan_hash:
-        plan_hash = hashlib.sha256(
-            json.dumps(plan_json, sort_keys=True, separators=(",", ":")).encode("utf-8")
-        ).hexdigest()
+        # Legacy rows without the stored hash: fall back to parsing the blob.
+        plan_res = store.get_result(body.plan_job_id)
+        if not plan_res:
+            raise HTTPException(status_code=404, detail="Plan result not found")
+
+        plan_json = orjson.loads(plan_res[0])
+        plan_hash = plan_json.get("plan_hash")
+        if not plan_hash:
+            canonical = orjson.dumps(plan_json, option=orjson.OPT_SORT_KEYS)
+            # Integrity hash, not a credential: skip FIPS bookkeeping and take
+            # the fastest OpenSSL backend (SHA-NI where available).
+            plan_hash = hashlib.sha256(canonical, usedforsecurity=False).hexdigest()
 
     token = secrets.token_urlsafe(32)
     ttl = max(10, min(int(body.ttl_seconds), 3600))
-    store.create_approval(token, body.plan_job_id, plan_hash, ttl_ms=ttl * 1000)
+    # One transaction for purge + insert instead of two commits.
+    with store.batch():
+        store.purge_expired_approvals()
+        store.create_approval(token, body.plan_job_id, plan_hash, ttl_ms=ttl * 1000)
 
     return {
         "approval_token": token,
@@ -156,18 +263,35 @@ def submit_job(
     if body.type in (5, 6, 7) and not body.approval_token:
         raise HTTPException(status_code=400, detail="approval_token is required for write jobs")
 
-    job_id = str(uuid.uuid4())
-    params_json = json.dumps(body.params)
-    roots_json = json.dumps(body.allowed_roots)
-
-    created, final_job_id = store.upsert_job_if_new(
-        job_id=job_id,
-        dedupe_key=body.dedupe_key,
-        jtype=body.type,
-        params_json=params_json,
-        allowed_roots_json=roots_json,
-        approval_token=body.approval_token,
-    )
+    cache_key = (body.dedupe_key, body.type)
+    cached_job_id = _dedupe_cache.get(cache_key)
+    if cached_job_id is not None:
+        _dedupe_cache.move_to_end(cache_key)
+        return {"created_new": False, "job_id": cached_job_id, "status": QUEUED}
+
+    job_id = _new_id()
+    try:
+        created, final_job_id = store.upsert_job_if_new(
+            job_id=job_id,
+            dedupe_key=body.dedupe_key,
+            jtype=body.type,
+            params=body.params,
+            # Resolve roots once at submit time so the worker's per-operation
+            # root checks start from already-canonical paths.
+            allowed_roots=[os.path.realpath(r) for r in body.allowed_roots],
+            approval_token=body.approval_token,
+        )
+    except ValueError as e:
+        # Typed-param coercion failed (e.g. non-numeric max_bytes): the
+        # client's mistake, reported as such rather than a 500.
+        raise HTTPException(status_code=400, detail=str(e))
+
+    _dedupe_cache[cache_key] = final_job_id
+    if len(_dedupe_cache) > _DEDUPE_MAX:
+        _dedupe_cache.popitem(last=False)
+
+    if created:
+        app.state.loop.call_soon_threadsafe(_notify_workers, final_job_id)
 
     return {"created_new": created, "job_id": final_job_id, "status": QUEUED}
 
@@ -182,6 +306,10 @@ def get_job(
     job = store.get_job(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
+    # Stored as compact JSON bytes; decode for the JSON response envelope.
+    for key in ("params_json", "allowed_roots_json"):
+        if isinstance(job.get(key), bytes):
+            job[key] = job[key].decode("utf-8")
     return job
 
 
@@ -192,8 +320,27 @@ def get_job_result(
     x_coworker_token: Optional[str] = Header(default=None),
 ):
     require_token(store, x_coworker_session, x_coworker_token)
-    res = store.get_result(job_id)
-    if not res:
+    meta = store.get_result_meta(job_id)
+    if not meta:
         raise HTTPException(status_code=404, detail="Result not found")
-    data, content_type = res
-    return {"content_type": content_type, "bytes_base64": base64.b64encode(data).decode("ascii")}
+    size, content_type = meta
+
+    # Raw bytes with the stored content type: the base64+JSON wrapper doubled
+    # memory and blocked the event loop while encoding large results.
+    if size <= _STREAM_THRESHOLD:
+        res = store.get_result(job_id)
+        if not res:
+            raise HTTPException(status_code=404, detail="Result not found")
+        return Response(content=res[0], media_type=content_type)
+
+    # Large results stream straight out of the sqlite BLOB in 64KB chunks,
+    # keeping peak RSS flat instead of holding the whole payload.
+    def _iter_blob():
+        blob = store.open_result_blob(job_id)
+        if blob is None:
+            return
+        with blob:
+            while chunk := blob.read(64 * 1024):
+                yield chunk
+
+    return StreamingResponse(_iter_blob(), media_type=content_type)
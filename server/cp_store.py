@@ -1,8 +1,16 @@
 from __future__ import annotations
 
+import json
 import sqlite3
+import threading
 import time
-from typing import Optional, Tuple, Any, Dict
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple, Any, Dict
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 SCHEMA = """
@@ -23,8 +31,10 @@ CREATE TABLE IF NOT EXISTS jobs (
   started_at_ms INTEGER,
   finished_at_ms INTEGER,
   error_message TEXT,
-  params_json TEXT NOT NULL,
-  allowed_roots_json TEXT NOT NULL,
+  -- Compact JSON bytes (BLOB affinity stores them verbatim); legacy rows
+  -- hold TEXT and readers accept either.
+  params_json BLOB NOT NULL,
+  allowed_roots_json BLOB NOT NULL,
 
   lease_owner TEXT,
   lease_expires_at_ms INTEGER,
@@ -34,11 +44,18 @@ CREATE TABLE IF NOT EXISTS jobs (
 
 CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_dedupe ON jobs(dedupe_key, type);
 
+-- Partial indexes keep the scheduler dequeue O(log queued) instead of a
+-- full scan of the (mostly terminal-state) jobs table, and stay tiny
+-- because finished jobs drop out of them.
+CREATE INDEX IF NOT EXISTS idx_jobs_queued ON jobs(created_at_ms) WHERE status=1;
+CREATE INDEX IF NOT EXISTS idx_jobs_lease_expired ON jobs(lease_expires_at_ms) WHERE status=2;
+
 CREATE TABLE IF NOT EXISTS results (
   job_id TEXT PRIMARY KEY,
   result_bytes BLOB NOT NULL,
   content_type TEXT NOT NULL,
   created_at_ms INTEGER NOT NULL,
+  plan_hash TEXT,
   FOREIGN KEY(job_id) REFERENCES jobs(job_id) ON DELETE CASCADE
 );
 
@@ -53,6 +70,18 @@ CREATE TABLE IF NOT EXISTS approvals (
 CREATE INDEX IF NOT EXISTS idx_approvals_expires ON approvals(expires_at_ms);
 """
 
+# Applied to every connection. WAL lets readers proceed during writes,
+# synchronous=NORMAL amortizes fsyncs to WAL checkpoints, and mmap_size
+# lets SQLite read pages straight from the OS page cache.
+PRAGMAS = """
+PRAGMA journal_mode=WAL;
+PRAGMA synchronous=NORMAL;
+PRAGMA temp_store=MEMORY;
+PRAGMA mmap_size=268435456;
+PRAGMA cache_size=-65536;
+PRAGMA busy_timeout=5000;
+"""
+
 # JobStatus mapping (aligned to proto)
 QUEUED = 1
 RUNNING = 2
@@ -65,45 +94,253 @@ def now_ms() -> int:
     return int(time.time() * 1000)
 
 
+def _pack_json(obj: Any) -> bytes:
+    """Compact JSON bytes for storage; orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+# Native types for string params arriving from the HTTP layer, keyed by
+# proto JobType value. Coercing once at enqueue time keeps .lower()/int()
+# re-parsing out of the worker loop and fails fast at submit time on
+# garbage values instead of inside the worker. Params not listed stay
+# strings.
+PARAM_SCHEMAS: Dict[int, Dict[str, type]] = {
+    1: {"hash_files": bool},  # SCAN_INDEX
+    3: {"max_bytes": int},  # READ_FILE
+    15: {"duration": int},  # LISTEN_MEETING
+}
+
+
+def _coerce_params(jtype: int, params: Dict[str, Any]) -> Dict[str, Any]:
+    schema = PARAM_SCHEMAS.get(jtype)
+    if not schema:
+        return params
+    out = dict(params)
+    for key, typ in schema.items():
+        val = out.get(key)
+        if isinstance(val, str):
+            if typ is bool:
+                out[key] = val.lower() == "true"
+            else:
+                try:
+                    out[key] = typ(val)
+                except ValueError:
+                    raise ValueError(f"Invalid value for param {key!r}: {val!r}") from None
+    return out
+
+
+def _unpack_json(raw: Any) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw)
+    if isinstance(raw, bytes):
+        raw = raw.decode("utf-8")
+    return json.loads(raw)
+
+
+# UPDATE ... RETURNING needs SQLite >= 3.35.
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+
 class CPStore:
+    """SQLite-backed control-plane store.
+
+    Connection topology: one persistent writer connection serialized by an
+    in-process lock, plus one cached read-only connection per thread. Under
+    WAL this avoids both per-call connection setup and SQLITE_BUSY retries
+    between concurrent writers.
+    """
+
+    # Hot statements as class constants: identical string objects per call let
+    # sqlite3's per-connection statement cache skip re-preparing the SQL now
+    # that connections persist.
+    _SQL_GET_SESSION = "SELECT token FROM sessions WHERE session_id=?"
+    _SQL_NEXT_QUEUED = "SELECT * FROM jobs WHERE status=? ORDER BY created_at_ms ASC LIMIT 1"
+    _SQL_GET_JOB = "SELECT * FROM jobs WHERE job_id=?"
+    _SQL_CLAIM = """UPDATE jobs
+                   SET status=?,
+                       started_at_ms=COALESCE(started_at_ms, ?),
+                       lease_owner=?,
+                       lease_expires_at_ms=?
+                   WHERE job_id=?
+                     AND (
+                        status=?
+                        OR (
+                           status=?
+                           AND lease_expires_at_ms IS NOT NULL
+                           AND lease_expires_at_ms < ?
+                        )
+                     )"""
+    # The claim subqueries take each runnable leg separately with a literal
+    # status: a parameterized status=? OR (...) disjunction implies neither
+    # partial-index predicate, so the planner fell back to scanning the whole
+    # (mostly terminal-state) jobs table per claim. One UNION ALL leg per
+    # index keeps the probe on idx_jobs_queued / idx_jobs_lease_expired, and
+    # the ORDER BY sorts only the handful of runnable rows.
+    _SQL_CLAIM_NEXT = f"""UPDATE jobs
+                   SET status={RUNNING},
+                       started_at_ms=COALESCE(started_at_ms, ?),
+                       lease_owner=?,
+                       lease_expires_at_ms=?
+                   WHERE job_id=(
+                       SELECT job_id FROM (
+                           SELECT job_id, created_at_ms FROM jobs
+                           WHERE status={QUEUED}
+                           UNION ALL
+                           SELECT job_id, created_at_ms FROM jobs
+                           WHERE status={RUNNING}
+                             AND lease_expires_at_ms IS NOT NULL
+                             AND lease_expires_at_ms < ?
+                       )
+                       ORDER BY created_at_ms ASC LIMIT 1
+                   )
+                   RETURNING *"""
+    _SQL_CLAIM_BATCH = f"""UPDATE jobs
+                   SET status={RUNNING},
+                       started_at_ms=COALESCE(started_at_ms, ?),
+                       lease_owner=?,
+                       lease_expires_at_ms=?
+                   WHERE job_id IN (
+                       SELECT job_id FROM (
+                           SELECT job_id, created_at_ms FROM jobs
+                           WHERE status={QUEUED}
+                           UNION ALL
+                           SELECT job_id, created_at_ms FROM jobs
+                           WHERE status={RUNNING}
+                             AND lease_expires_at_ms IS NOT NULL
+                             AND lease_expires_at_ms < ?
+                       )
+                       ORDER BY created_at_ms ASC LIMIT ?
+                   )
+                   RETURNING *"""
+    _SQL_INSERT_JOB = """INSERT INTO jobs(
+                       job_id, dedupe_key, type, status, created_at_ms,
+                       params_json, allowed_roots_json, approval_token
+                   )
+                   VALUES(?,?,?,?,?,?,?,?)
+                   ON CONFLICT(dedupe_key, type) DO NOTHING
+                   RETURNING job_id"""
+    _SQL_GET_RESULT = "SELECT result_bytes, content_type FROM results WHERE job_id=?"
+    _SQL_GET_PLAN_HASH = "SELECT plan_hash FROM results WHERE job_id=?"
+    _SQL_VALIDATE_APPROVAL = """SELECT token FROM approvals
+               WHERE token=? AND plan_job_id=? AND plan_hash=? AND expires_at_ms>?"""
+
     def __init__(self, db_path: str):
         self.db_path = db_path
+        self._local = threading.local()
         self._init()
+        self._writer = self._conn()
+        # RLock so store methods can run unchanged inside batch().
+        self._writer_lock = threading.RLock()
+        self._in_batch = False
+        self._batch_now = 0
 
     def _conn(self) -> sqlite3.Connection:
-        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, cached_statements=256)
         conn.row_factory = sqlite3.Row
+        conn.executescript(PRAGMAS)
         return conn
 
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        """Persistent writer connection, one transaction per use.
+
+        Inside batch() the enclosing transaction owns commit/rollback and
+        this becomes a plain handle to the writer.
+        """
+        with self._writer_lock:
+            if self._in_batch:
+                yield self._writer
+                return
+            try:
+                yield self._writer
+                self._writer.commit()
+            except Exception:
+                self._writer.rollback()
+                raise
+
+    @contextmanager
+    def batch(self) -> Iterator["CPStore"]:
+        """Group several store writes into one BEGIN IMMEDIATE transaction.
+
+        IMMEDIATE takes the write lock up front, avoiding the deferred
+        upgrade path that surfaces as SQLITE_BUSY under contention. N writes
+        collapse to a single WAL commit/fsync.
+        """
+        with self._writer_lock:
+            self._writer.execute("BEGIN IMMEDIATE")
+            self._in_batch = True
+            # All writes in the batch share one timestamp so rows committed
+            # together agree on causal ordering.
+            self._batch_now = now_ms()
+            try:
+                yield self
+                self._writer.commit()
+            except Exception:
+                self._writer.rollback()
+                raise
+            finally:
+                self._in_batch = False
+
+    def _now(self) -> int:
+        """Timestamp for writes; frozen while inside batch()."""
+        return self._batch_now if self._in_batch else now_ms()
+
+    def _read_conn(self) -> sqlite3.Connection:
+        """Cached per-thread connection for read-only statements.
+
+        Read-only statements never block under WAL, so each thread can keep
+        one connection open instead of paying connect + pragma setup per call.
+        """
+        conn = getattr(self._local, "read_conn", None)
+        if conn is None:
+            conn = self._conn()
+            self._local.read_conn = conn
+        return conn
+
+    def _read_one(self, sql: str, params: tuple) -> Optional[tuple]:
+        """Single-row read returning a plain tuple.
+
+        Hot narrow reads skip sqlite3.Row construction and its per-key
+        name lookups; callers index positionally.
+        """
+        cur = self._read_conn().execute(sql, params)
+        cur.row_factory = None
+        return cur.fetchone()
+
     def _init(self) -> None:
         conn = self._conn()
         try:
             conn.executescript(SCHEMA)
+            try:
+                conn.execute("ALTER TABLE results ADD COLUMN plan_hash TEXT")
+            except sqlite3.OperationalError:
+                pass  # column already exists
             conn.commit()
         finally:
             conn.close()
 
+    def close(self) -> None:
+        """Close the writer and this thread's cached reader connection."""
+        with self._writer_lock:
+            self._writer.close()
+        conn = getattr(self._local, "read_conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.read_conn = None
+
     # ---------- sessions ----------
     def create_session(self, session_id: str, token: str) -> None:
-        conn = self._conn()
-        try:
+        with self._write() as conn:
             conn.execute(
                 "INSERT OR REPLACE INTO sessions(session_id, token, created_at_ms) VALUES(?,?,?)",
-                (session_id, token, now_ms()),
+                (session_id, token, self._now()),
             )
-            conn.commit()
-        finally:
-            conn.close()
 
     def get_session_token(self, session_id: str) -> Optional[str]:
-        conn = self._conn()
-        try:
-            row = conn.execute(
-                "SELECT token FROM sessions WHERE session_id=?", (session_id,)
-            ).fetchone()
-            return None if row is None else str(row["token"])
-        finally:
-            conn.close()
+        row = self._read_one(self._SQL_GET_SESSION, (session_id,))
+        return None if row is None else row[0]
 
     # ---------- jobs ----------
     def upsert_job_if_new(
@@ -111,84 +348,114 @@ class CPStore:
         job_id: str,
         dedupe_key: str,
         jtype: int,
-        params_json: str,
-        allowed_roots_json: str,
+        params: Dict[str, Any],
+        allowed_roots: List[str],
         approval_token: Optional[str],
     ) -> Tuple[bool, str]:
-        """Returns (created_new, existing_or_new_job_id). Enforces idempotency by unique(dedupe_key, type)."""
-        conn = self._conn()
-        try:
+        """Returns (created_new, existing_or_new_job_id). Enforces idempotency by unique(dedupe_key, type).
+
+        The common case (new job) is one INSERT .. ON CONFLICT DO NOTHING
+        RETURNING; only a dedupe hit pays a second statement to fetch the
+        canonical id. The probe-then-insert pair (and its race window) is
+        kept only for SQLite builds without RETURNING.
+        """
+        params = _coerce_params(jtype, params)
+        with self._write() as conn:
+            args = (
+                job_id,
+                dedupe_key,
+                jtype,
+                QUEUED,
+                self._now(),
+                _pack_json(params),
+                _pack_json(allowed_roots),
+                approval_token,
+            )
+            if _HAS_RETURNING:
+                if conn.execute(self._SQL_INSERT_JOB, args).fetchone() is not None:
+                    return (True, job_id)
+                row = conn.execute(
+                    "SELECT job_id FROM jobs WHERE dedupe_key=? AND type=?",
+                    (dedupe_key, jtype),
+                ).fetchone()
+                return (False, str(row["job_id"]))
+
             row = conn.execute(
                 "SELECT job_id FROM jobs WHERE dedupe_key=? AND type=?",
                 (dedupe_key, jtype),
             ).fetchone()
             if row is not None:
                 return (False, str(row["job_id"]))
-
-            conn.execute(
-                """INSERT INTO jobs(
-                       job_id, dedupe_key, type, status, created_at_ms,
-                       params_json, allowed_roots_json, approval_token
-                   )
-                   VALUES(?,?,?,?,?,?,?,?)""",
-                (
-                    job_id,
-                    dedupe_key,
-                    jtype,
-                    QUEUED,
-                    now_ms(),
-                    params_json,
-                    allowed_roots_json,
-                    approval_token,
-                ),
-            )
-            conn.commit()
+            conn.execute(self._SQL_INSERT_JOB.split("ON CONFLICT")[0], args)
             return (True, job_id)
-        finally:
-            conn.close()
 
     def fetch_next_queued_job(self) -> Optional[Dict[str, Any]]:
-        conn = self._conn()
-        try:
-            row = conn.execute(
-                "SELECT * FROM jobs WHERE status=? ORDER BY created_at_ms ASC LIMIT 1",
-                (QUEUED,),
-            ).fetchone()
-            return None if row is None else dict(row)
-        finally:
-            conn.close()
+        row = self._read_conn().execute(self._SQL_NEXT_QUEUED, (QUEUED,)).fetchone()
+        return None if row is None else dict(row)
 
     def claim_job_lease(self, job_id: str, worker_id: str, lease_ms: int = 30_000) -> bool:
         """Lease claim: transition QUEUED->RUNNING, or reclaim RUNNING if lease expired."""
-        conn = self._conn()
-        try:
-            t = now_ms()
+        with self._write() as conn:
+            t = self._now()
             expires = t + lease_ms
             cur = conn.execute(
-                """UPDATE jobs
-                   SET status=?,
-                       started_at_ms=COALESCE(started_at_ms, ?),
-                       lease_owner=?,
-                       lease_expires_at_ms=?
-                   WHERE job_id=?
-                     AND (
-                        status=?
-                        OR (
-                           status=?
-                           AND lease_expires_at_ms IS NOT NULL
-                           AND lease_expires_at_ms < ?
-                        )
-                     )""",
+                self._SQL_CLAIM,
                 (RUNNING, t, worker_id, expires, job_id, QUEUED, RUNNING, t),
             )
-            conn.commit()
             return cur.rowcount == 1
-        finally:
-            conn.close()
+
+    def claim_next_queued(self, worker_id: str, lease_ms: int = 30_000) -> Optional[Dict[str, Any]]:
+        """Atomically claim the oldest runnable job and return its row.
+
+        Collapses the fetch-then-claim pair into one statement, which also
+        closes the race where two workers read the same queued row and one
+        wastes a round trip losing the UPDATE.
+        """
+        if not _HAS_RETURNING:
+            job = self.fetch_next_queued_job()
+            if job is not None and self.claim_job_lease(job["job_id"], worker_id, lease_ms):
+                return self._with_parsed_params(self.get_job(job["job_id"]))
+            return None
+
+        with self._write() as conn:
+            t = self._now()
+            row = conn.execute(
+                self._SQL_CLAIM_NEXT,
+                (t, worker_id, t + lease_ms, t),
+            ).fetchone()
+            return None if row is None else self._with_parsed_params(dict(row))
+
+    def claim_next_queued_jobs(
+        self, worker_id: str, n: int, lease_ms: int = 30_000
+    ) -> List[Dict[str, Any]]:
+        """Claim up to ``n`` runnable jobs in one round trip.
+
+        A single UPDATE leases the whole batch, so a worker draining a burst
+        pays one write transaction instead of one per job.
+        """
+        if not _HAS_RETURNING or n <= 1:
+            job = self.claim_next_queued(worker_id, lease_ms=lease_ms)
+            return [] if job is None else [job]
+
+        with self._write() as conn:
+            t = self._now()
+            rows = conn.execute(
+                self._SQL_CLAIM_BATCH,
+                (t, worker_id, t + lease_ms, t, n),
+            ).fetchall()
+            return [self._with_parsed_params(dict(r)) for r in rows]
+
+    @staticmethod
+    def _with_parsed_params(job: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Attach parsed params/allowed_roots so the worker never re-parses
+        the stored JSON bytes on its hot path."""
+        if job is not None:
+            job["params"] = _unpack_json(job["params_json"])
+            job["allowed_roots"] = _unpack_json(job["allowed_roots_json"])
+        return job
 
     def complete_job(self, job_id: str, ok: bool, error_message: Optional[str] = None) -> None:
-        conn = self._conn()
-        try:
+        with self._write() as conn:
             status = SUCCEEDED if ok else FAILED
             conn.execute(
                 """UPDATE jobs
@@ -198,75 +465,119 @@ class CPStore:
                        lease_owner=NULL,
                        lease_expires_at_ms=NULL
                    WHERE job_id=?""",
-                (status, now_ms(), error_message, job_id),
+                (status, self._now(), error_message, job_id),
             )
-            conn.commit()
-        finally:
-            conn.close()
 
     def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
-        conn = self._conn()
-        try:
-            row = conn.execute("SELECT * FROM jobs WHERE job_id=?", (job_id,)).fetchone()
-            return None if row is None else dict(row)
-        finally:
-            conn.close()
+        row = self._read_conn().execute(self._SQL_GET_JOB, (job_id,)).fetchone()
+        return None if row is None else dict(row)
 
     # ---------- results ----------
-    def put_result(self, job_id: str, result_bytes: bytes, content_type: str) -> None:
-        conn = self._conn()
-        try:
+    def put_result(
+        self,
+        job_id: str,
+        result_bytes: bytes,
+        content_type: str,
+        plan_hash: Optional[str] = None,
+    ) -> None:
+        with self._write() as conn:
             conn.execute(
-                "INSERT OR REPLACE INTO results(job_id, result_bytes, content_type, created_at_ms) VALUES(?,?,?,?)",
-                (job_id, result_bytes, content_type, now_ms()),
+                "INSERT OR REPLACE INTO results(job_id, result_bytes, content_type, created_at_ms, plan_hash) VALUES(?,?,?,?,?)",
+                (job_id, result_bytes, content_type, self._now(), plan_hash),
+            )
+
+    def put_result_and_complete(
+        self,
+        job_id: str,
+        result_bytes: bytes,
+        content_type: str,
+        ok: bool,
+        error_message: Optional[str] = None,
+        plan_hash: Optional[str] = None,
+    ) -> None:
+        """Write the result and the terminal job status in one transaction.
+
+        Group-commits the two per-job writes so the WAL is fsynced once per
+        finished job instead of twice.
+        """
+        with self._write() as conn:
+            t = self._now()
+            status = SUCCEEDED if ok else FAILED
+            conn.execute(
+                "INSERT OR REPLACE INTO results(job_id, result_bytes, content_type, created_at_ms, plan_hash) VALUES(?,?,?,?,?)",
+                (job_id, result_bytes, content_type, t, plan_hash),
+            )
+            conn.execute(
+                """UPDATE jobs
+                   SET status=?,
+                       finished_at_ms=?,
+                       error_message=?,
+                       lease_owner=NULL,
+                       lease_expires_at_ms=NULL
+                   WHERE job_id=?""",
+                (status, t, error_message, job_id),
+            )
+
+    def get_result_meta(self, job_id: str) -> Optional[Tuple[int, str]]:
+        """(size_bytes, content_type) without materializing the BLOB."""
+        row = self._read_one(
+            "SELECT length(result_bytes), content_type FROM results WHERE job_id=?",
+            (job_id,),
+        )
+        return None if row is None else (int(row[0]), str(row[1]))
+
+    def open_result_blob(self, job_id: str) -> Optional[sqlite3.Blob]:
+        """Incremental read handle over a result BLOB.
+
+        Lets callers stream large results in chunks instead of copying the
+        whole payload into one Python bytes object. The handle is bound to
+        the calling thread's cached read connection; close it when done.
+        """
+        conn = self._read_conn()
+        cur = conn.execute("SELECT rowid FROM results WHERE job_id=?", (job_id,))
+        cur.row_factory = None
+        row = cur.fetchone()
+        if row is None:
+            return None
+        return conn.blobopen("results", "result_bytes", row[0], readonly=True)
+
+    def get_plan_hash(self, job_id: str) -> Optional[str]:
+        """Plan hash stored at result-write time; None for legacy rows."""
+        row = self._read_one(self._SQL_GET_PLAN_HASH, (job_id,))
+        return None if row is None else row[0]
+
+    def set_plan_hash(self, job_id: str, plan_hash: str) -> None:
+        """Backfill the memoized hash on a legacy result row."""
+        with self._write() as conn:
+            conn.execute(
+                "UPDATE results SET plan_hash=? WHERE job_id=? AND plan_hash IS NULL",
+                (plan_hash, job_id),
             )
-            conn.commit()
-        finally:
-            conn.close()
 
     def get_result(self, job_id: str) -> Optional[Tuple[bytes, str]]:
-        conn = self._conn()
-        try:
-            row = conn.execute(
-                "SELECT result_bytes, content_type FROM results WHERE job_id=?",
-                (job_id,),
-            ).fetchone()
-            if row is None:
-                return None
-            return (bytes(row["result_bytes"]), str(row["content_type"]))
-        finally:
-            conn.close()
+        row = self._read_one(self._SQL_GET_RESULT, (job_id,))
+        if row is None:
+            return None
+        # sqlite3 already returns BLOB columns as bytes; wrapping in bytes()
+        # again would memcpy the whole payload.
+        return (row[0], row[1])
 
     # ---------- approvals ----------
     def create_approval(self, token: str, plan_job_id: str, plan_hash: str, ttl_ms: int) -> None:
-        conn = self._conn()
-        try:
+        with self._write() as conn:
+            t = self._now()
             conn.execute(
                 "INSERT INTO approvals(token, plan_job_id, plan_hash, expires_at_ms, created_at_ms) VALUES(?,?,?,?,?)",
-                (token, plan_job_id, plan_hash, now_ms() + ttl_ms, now_ms()),
+                (token, plan_job_id, plan_hash, t + ttl_ms, t),
             )
-            conn.commit()
-        finally:
-            conn.close()
 
     def validate_approval(self, token: str, plan_job_id: str, plan_hash: str) -> bool:
-        conn = self._conn()
-        try:
-            t = now_ms()
-            row = conn.execute(
-                """SELECT token FROM approvals
-                   WHERE token=? AND plan_job_id=? AND plan_hash=? AND expires_at_ms>?""",
-                (token, plan_job_id, plan_hash, t),
-            ).fetchone()
-            return row is not None
-        finally:
-            conn.close()
+        row = self._read_one(
+            self._SQL_VALIDATE_APPROVAL,
+            (token, plan_job_id, plan_hash, now_ms()),
+        )
+        return row is not None
 
     def purge_expired_approvals(self) -> None:
-        conn = self._conn()
-        try:
-            t = now_ms()
-            conn.execute("DELETE FROM approvals WHERE expires_at_ms<=?", (t,))
-            conn.commit()
-        finally:
-            conn.close()
+        with self._write() as conn:
+            conn.execute("DELETE FROM approvals WHERE expires_at_ms<=?", (self._now(),))
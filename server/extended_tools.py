@@ -1,8 +1,25 @@
 import os
+import asyncio
+import atexit
+import io
 import json
+import mmap
+import re
+import struct
 import subprocess
+import sys
+import threading
+import wave
+from collections import deque
 import httpx
-from bs4 import BeautifulSoup
+from lxml import etree
+
+# Optional lexbor-backed parser: one C pass for strip+extract. Falls back
+# to the streaming lxml path below when selectolax isn't installed.
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
 import xlsxwriter
 from docx import Document
 from fpdf import FPDF
@@ -16,43 +33,215 @@ try:
 except ImportError:
     TRANSCRIPTION_SUPPORT = False
 
-def browse_web(url: str) -> str:
-    """Fetch and return text content from a URL."""
+# In-memory audio capture; MCI (Windows-only, file-based) is the fallback.
+try:
+    import sounddevice as sd
+    SD_SUPPORT = True
+except (ImportError, OSError):
+    SD_SUPPORT = False
+
+# One pooled client for every outbound request: repeat calls to the same
+# host reuse the TCP+TLS connection instead of handshaking from scratch,
+# and HTTP/2 lets concurrent calls multiplex over it.
+_HTTP = httpx.Client(
+    http2=True,
+    follow_redirects=True,
+    timeout=10.0,
+    limits=httpx.Limits(max_keepalive_connections=20),
+)
+atexit.register(_HTTP.close)
+
+# All Gemini endpoints hang off one host; both clients keep a warm HTTP/2
+# connection to it across calls.
+_GEMINI_BASE = "https://generativelanguage.googleapis.com"
+
+# Async twin of _HTTP for callers already on an event loop; closed by the
+# control-plane app's shutdown hook rather than atexit (close() must be
+# awaited).
+_HTTP_ASYNC = httpx.AsyncClient(
+    http2=True,
+    follow_redirects=True,
+    timeout=10.0,
+    limits=httpx.Limits(max_keepalive_connections=20),
+)
+
+# Compiled once at import: one C pass each for run-of-spaces and
+# blank-line collapsing, replacing the old per-call generator pipeline.
+_WS_COLLAPSE = re.compile(r"[ \t\r\f\v]+")
+_NL_COLLAPSE = re.compile(r"\n[ \t]*(?:\n[ \t]*)+")
+_TEXT_CAP = 10_000  # max chars returned to the model
+_FETCH_CAP = 512 * 1024  # stop downloading once this many body bytes arrived
+_SKIP_TAGS = {"script", "style"}
+
+
+def _html_to_text(body: bytes) -> str:
+    """Extract capped plain text from a full HTML body (bytes in, str out)."""
+    if LexborHTMLParser is not None:
+        tree = LexborHTMLParser(body)
+        tree.strip_tags(["script", "style", "noscript"])
+        text = tree.body.text(separator="\n") if tree.body else ""
+    else:
+        parser = etree.HTMLPullParser(events=("end",))
+        parser.feed(body)
+        # libxml2 only emits end events for elements left open at EOF
+        # (unclosed <body> etc. — most real pages) once the parser closes;
+        # without this, their text never reaches read_events.
+        try:
+            parser.close()
+        except etree.XMLSyntaxError:
+            pass
+        pieces: list = []
+        for _, elem in parser.read_events():
+            if elem.tag in _SKIP_TAGS:
+                elem.clear()
+                continue
+            for part in (elem.text, elem.tail):
+                if part and not part.isspace():
+                    pieces.append(part.strip())
+            elem.clear()
+        text = "\n".join(pieces)
+    text = _WS_COLLAPSE.sub(" ", text)
+    return _NL_COLLAPSE.sub("\n", text).strip()[:_TEXT_CAP]
+
+async def browse_web_async(url: str) -> str:
+    """Async browse_web: shared AsyncClient, same text extraction and cap.
+
+    Lets callers fan out K fetches with one gather so the wall clock is
+    max(RTT) instead of K * RTT.
+    """
     try:
-        response = httpx.get(url, follow_redirects=True, timeout=10.0)
+        response = await _HTTP_ASYNC.get(url)
         response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        for script_or_style in soup(["script", "style"]):
-            script_or_style.decompose()
-            
-        text = soup.get_text(separator='\n')
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = '\n'.join(chunk for chunk in chunks if chunk)
-        
-        return text[:10000]
+        return _html_to_text(response.content)
+    except Exception as e:
+        return f"Error browsing {url}: {str(e)}"
+
+def browse_web(url: str) -> str:
+    """Fetch and return text content from a URL.
+
+    The response is streamed straight into lxml's incremental HTML parser
+    (libxml2) and text is accumulated tag-by-tag, so we never hold the raw
+    body, a parse tree, and the extracted text in memory at once. Reading
+    stops as soon as the 10k-char output cap is reached.
+    """
+    try:
+        if LexborHTMLParser is not None:
+            # Stream the body up to the byte cap, then hand the raw bytes to
+            # lexbor in one pass; multi-MB pages stop costing bandwidth and
+            # parser CPU for text we'd throw away anyway.
+            with _HTTP.stream("GET", url) as response:
+                response.raise_for_status()
+                buf = bytearray()
+                for chunk in response.iter_bytes(chunk_size=65536):
+                    buf.extend(chunk)
+                    if len(buf) >= _FETCH_CAP:
+                        break
+            return _html_to_text(bytes(buf))
+
+        parser = etree.HTMLPullParser(events=("end",))
+        pieces: list = []
+        total = 0
+        read_bytes = 0
+
+        def _drain() -> None:
+            nonlocal total
+            for _, elem in parser.read_events():
+                if elem.tag in _SKIP_TAGS:
+                    elem.clear()
+                    continue
+                for part in (elem.text, elem.tail):
+                    if part and not part.isspace():
+                        pieces.append(part.strip())
+                        total += len(part)
+                elem.clear()
+
+        with _HTTP.stream("GET", url) as response:
+            response.raise_for_status()
+            # Raw bytes into libxml2, which sniffs the charset itself;
+            # iter_text would decode the whole body in Python first.
+            for chunk in response.iter_bytes():
+                read_bytes += len(chunk)
+                parser.feed(chunk)
+                _drain()
+                if total >= _TEXT_CAP or read_bytes >= _FETCH_CAP:
+                    break
+            else:
+                # Page fully read: close the parser so libxml2 emits end
+                # events for elements still open at EOF (most real pages
+                # never close <body>), then drain what those release.
+                try:
+                    parser.close()
+                except etree.XMLSyntaxError:
+                    pass
+                _drain()
+        text = _WS_COLLAPSE.sub(" ", "\n".join(pieces))
+        return _NL_COLLAPSE.sub("\n", text).strip()[:_TEXT_CAP]
     except Exception as e:
         return f"Error browsing {url}: {str(e)}"
 
 def create_excel(path: str, data: List[Dict[str, Any]]) -> str:
-    """Create an Excel file using xlsxwriter."""
+    """Create an Excel file using xlsxwriter.
+
+    constant_memory streams each finished row to disk instead of holding
+    the whole workbook in RAM, and write_row replaces the per-cell write
+    calls, so large exports cost one xlsxwriter call per row at O(1) memory.
+    """
     try:
-        workbook = xlsxwriter.Workbook(path)
+        workbook = xlsxwriter.Workbook(
+            path, {"constant_memory": True, "strings_to_numbers": False}
+        )
         worksheet = workbook.add_worksheet()
-        
+
         if not data:
             workbook.close()
             return f"Created empty Excel file at {path}"
-            
+
         headers = list(data[0].keys())
-        for col, header in enumerate(headers):
-            worksheet.write(0, col, header)
-            
-        for row_idx, row_data in enumerate(data, start=1):
-            for col_idx, header in enumerate(headers):
-                worksheet.write(row_idx, col_idx, str(row_data.get(header, "")))
-                
+        worksheet.write_row(0, 0, headers)
+
+        # Probe column types from the first row: numeric columns go through
+        # write_number so values land as real numbers instead of being
+        # stringified (and without strings_to_numbers re-parsing them).
+        def _is_num(v: Any) -> bool:
+            return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+        writers = [worksheet.write_number if _is_num(data[0].get(h)) else None for h in headers]
+
+        if not any(writers):
+            # All-string rows keep the one-call-per-row fast path.
+            for row_idx, row_data in enumerate(data, start=1):
+                worksheet.write_row(row_idx, 0, [str(row_data.get(h, "")) for h in headers])
+        else:
+            write_string = worksheet.write_string
+            for row_idx, row_data in enumerate(data, start=1):
+                for col_idx, h in enumerate(headers):
+                    v = row_data.get(h, "")
+                    w = writers[col_idx]
+                    if w is not None and _is_num(v):
+                        w(row_idx, col_idx, v)
+                    else:
+                        write_string(row_idx, col_idx, str(v))
+
+        workbook.close()
+        return f"Successfully created Excel file at {path}"
+    except Exception as e:
+        return f"Error creating Excel: {str(e)}"
+
+def create_excel_columnar(path: str, columns: Dict[str, List[Any]]) -> str:
+    """Create an Excel file from columnar (struct-of-arrays) data.
+
+    Callers that already hold column vectors skip the per-cell dict lookups
+    of the row-oriented path: each column goes down in one write_column
+    call over a contiguous list.
+    """
+    try:
+        workbook = xlsxwriter.Workbook(path, {"strings_to_numbers": False})
+        worksheet = workbook.add_worksheet()
+
+        for col_idx, (header, values) in enumerate(columns.items()):
+            worksheet.write(0, col_idx, header)
+            worksheet.write_column(1, col_idx, [str(v) for v in values])
+
         workbook.close()
         return f"Successfully created Excel file at {path}"
     except Exception as e:
@@ -74,61 +263,180 @@ def create_pdf(path: str, content: str) -> str:
         pdf = FPDF()
         pdf.add_page()
         pdf.set_font("helvetica", size=12)
-        for line in content.split('\n'):
-            pdf.multi_cell(0, 10, txt=line)
+        # One multi_cell call for the whole body: FPDF wraps and breaks
+        # lines internally, so splitting per-line in Python just re-enters
+        # the layout machinery N times.
+        pdf.multi_cell(0, 10, txt=content)
         pdf.output(path)
         return f"Successfully created PDF file at {path}"
     except Exception as e:
         return f"Error creating PDF: {str(e)}"
 
-def execute_python_code(code: str) -> str:
-    """Execute Python code locally and return stdout."""
+# Tiny REPL run inside the persistent exec worker: read a length-prefixed
+# code blob, exec it in a fresh namespace with stdout/stderr captured, and
+# write the captured output back length-prefixed. Keeping one interpreter
+# alive avoids paying CPython startup (~100ms of site/encodings imports)
+# on every execute_python call.
+_EXEC_WORKER_SRC = r"""
+import sys, struct, io, contextlib, traceback
+stdin, stdout = sys.stdin.buffer, sys.stdout.buffer
+while True:
+    hdr = stdin.read(4)
+    if len(hdr) < 4:
+        break
+    code = stdin.read(struct.unpack(">I", hdr)[0]).decode("utf-8")
+    buf = io.StringIO()
     try:
-        temp_file = "temp_exec.py"
-        with open(temp_file, "w", encoding="utf-8") as f:
-            f.write(code)
-        
+        with contextlib.redirect_stdout(buf), contextlib.redirect_stderr(buf):
+            exec(code, {"__name__": "__main__"})
+    except BaseException:
+        traceback.print_exc(file=buf)
+    out = buf.getvalue().encode("utf-8")
+    stdout.write(struct.pack(">I", len(out)) + out)
+    stdout.flush()
+"""
+
+_exec_proc = None
+_exec_lock = threading.Lock()
+
+
+def _exec_worker():
+    """Return the live worker subprocess, (re)spawning it if needed."""
+    global _exec_proc
+    if _exec_proc is None or _exec_proc.poll() is not None:
         py_exec = os.path.join(os.getcwd(), "venv", "Scripts", "python.exe")
         if not os.path.exists(py_exec):
-            py_exec = "python"
-
-        result = subprocess.run(
-            [py_exec, temp_file],
-            capture_output=True,
-            text=True,
-            timeout=30
+            py_exec = sys.executable
+        _exec_proc = subprocess.Popen(
+            [py_exec, "-u", "-c", _EXEC_WORKER_SRC],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
         )
-        
-        if os.path.exists(temp_file):
-            os.remove(temp_file)
-        
-        output = result.stdout
-        if result.stderr:
-            output += f"\nErrors:\n{result.stderr}"
-        return output if output else "Code executed successfully (no output)."
-    except subprocess.TimeoutExpired:
-        if os.path.exists(temp_file):
-            os.remove(temp_file)
-        return "Error: Execution timed out (30s limit)"
-    except Exception as e:
-        return f"Error executing code: {str(e)}"
+    return _exec_proc
+
+
+def _kill_exec_worker() -> None:
+    global _exec_proc
+    if _exec_proc is not None and _exec_proc.poll() is None:
+        _exec_proc.kill()
+    _exec_proc = None
+
+
+atexit.register(_kill_exec_worker)
+
+
+def execute_python_code(code: str) -> str:
+    """Execute Python code in the persistent worker and return its output.
+
+    The code is sent over the worker's stdin pipe (no temp file), so repeat
+    calls skip interpreter startup entirely. A hung snippet gets the worker
+    killed and respawned on the next call.
+    """
+    with _exec_lock:
+        try:
+            proc = _exec_worker()
+            blob = code.encode("utf-8")
+            proc.stdin.write(struct.pack(">I", len(blob)) + blob)
+            proc.stdin.flush()
+
+            # Pipe reads can't be given a timeout portably (select doesn't
+            # cover pipes on Windows), so read on a scratch thread.
+            result: list = []
+
+            def _read() -> None:
+                hdr = proc.stdout.read(4)
+                if len(hdr) == 4:
+                    result.append(proc.stdout.read(struct.unpack(">I", hdr)[0]))
+
+            reader = threading.Thread(target=_read, daemon=True)
+            reader.start()
+            reader.join(30)
+            if reader.is_alive():
+                _kill_exec_worker()
+                return "Error: Execution timed out (30s limit)"
+            if not result:
+                _kill_exec_worker()
+                return "Error: Python worker exited unexpectedly"
+
+            output = result[0].decode("utf-8", "replace")
+            return output if output else "Code executed successfully (no output)."
+        except Exception as e:
+            _kill_exec_worker()
+            return f"Error executing code: {str(e)}"
+
+# The chunked fallback scans the newest 1MiB first; older history is only
+# touched if that window can't fill 20 matches.
+_TAIL_SCAN_BYTES = 1 << 20
+
+def _search_audit_chunks(f, pat) -> deque:
+    """Fallback scanner for hosts where mmap fails (empty file after the
+    size probe, network shares, exotic filesystems): fixed 64KB reads with
+    a carry buffer for the partial last line, same bounded 20-match ring.
+    """
+    matches: deque = deque(maxlen=20)
+    carry = b""
+    while chunk := f.read(1 << 16):
+        lines = (carry + chunk).split(b"\n")
+        carry = lines.pop()
+        for line in lines:
+            if pat.search(line):
+                matches.append(line.decode("utf-8", "replace").strip())
+    if carry and pat.search(carry):
+        matches.append(carry.decode("utf-8", "replace").strip())
+    return matches
 
 def search_audit_logs(query: str, workspace_root: str) -> str:
+    """Search the audit JSONL for lines containing `query` (last 20 matches).
+
+    Only the last 20 matches are ever returned, so the mmapped view is
+    walked backwards from EOF line by line with one compiled
+    case-insensitive pattern, and the scan stops as soon as 20 hits are
+    collected -- a common query over a long log touches only its tail.
+    """
     audit_path = os.path.join(workspace_root, ".coworker_audit.jsonl")
     if not os.path.exists(audit_path):
         return "No audit logs found in this workspace."
-    
-    matches = []
+
+    matches: deque = deque()
     try:
-        with open(audit_path, "r", encoding="utf-8") as f:
-            for line in f:
-                if query.lower() in line.lower():
-                    matches.append(line.strip())
-        
+        pat = re.compile(re.escape(query.encode("utf-8")), re.IGNORECASE)
+        with open(audit_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return f"No matches found for '{query}' in audit logs."
+            try:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, OSError):
+                size = os.fstat(f.fileno()).st_size
+                if size > _TAIL_SCAN_BYTES:
+                    # Tail-first heuristic: recent matches almost always
+                    # satisfy the query, making the common case O(1) in
+                    # file size. The rare under-filled window rescans.
+                    f.seek(size - _TAIL_SCAN_BYTES)
+                    f.readline()  # drop the partial first line
+                    matches = _search_audit_chunks(f, pat)
+                    if len(matches) < 20:
+                        f.seek(0)
+                        matches = _search_audit_chunks(f, pat)
+                else:
+                    matches = _search_audit_chunks(f, pat)
+            else:
+                with mm:
+                    end = len(mm)
+                    if mm[end - 1] == 0x0A:  # trailing newline
+                        end -= 1
+                    while end > 0 and len(matches) < 20:
+                        start = mm.rfind(b"\n", 0, end) + 1
+                        if pat.search(mm, start, end):
+                            matches.appendleft(
+                                mm[start:end].decode("utf-8", "replace").strip()
+                            )
+                        end = start - 1
+
         if not matches:
             return f"No matches found for '{query}' in audit logs."
-        
-        return "\n".join(matches[-20:])
+
+        return "\n".join(matches)
     except Exception as e:
         return f"Error searching logs: {str(e)}"
 
@@ -172,38 +480,101 @@ def record_audio_native(path: str, duration: int) -> None:
         # 4. Cleanup
         send("close capture")
 
+def _record_audio_sd(duration: int) -> bytes:
+    """Record mono 16 kHz int16 audio and return WAV bytes, all in memory.
+
+    16 kHz int16 is plenty for speech and a fraction of the default
+    44.1 kHz float32; the WAV container is assembled in a BytesIO so
+    nothing touches disk.
+    """
+    fs = 16000
+    frames = sd.rec(int(duration * fs), samplerate=fs, channels=1, dtype="int16")
+    sd.wait()
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(fs)
+        wf.writeframes(frames.tobytes())
+    return buf.getvalue()
+
+_GEMINI_UPLOAD_URL = _GEMINI_BASE + "/upload/v1beta/files"
+
+
+def _upload_audio_raw(audio: bytes, api_key: str) -> str:
+    """Push WAV bytes through the Files API raw upload; returns the file URI.
+
+    Raw protocol sends the buffer as-is -- no base64 inflation and no
+    extra full-buffer copy in Python.
+    """
+    r = _HTTP.post(
+        _GEMINI_UPLOAD_URL,
+        params={"key": api_key},
+        headers={"X-Goog-Upload-Protocol": "raw", "Content-Type": "audio/wav"},
+        content=audio,
+        timeout=30.0,
+    )
+    r.raise_for_status()
+    return r.json()["file"]["uri"]
+
+
+def record_audio(duration: int) -> bytes:
+    """Capture `duration` seconds of mono audio and return WAV bytes.
+
+    Uses sounddevice (WASAPI shared mode on Windows) for the in-memory
+    16 kHz int16 path; without it, the MCI fallback records to a temp WAV
+    that is read back and removed here, so callers only ever see bytes.
+    """
+    if SD_SUPPORT:
+        return _record_audio_sd(duration)
+    temp_wav = os.path.join(os.getcwd(), "meeting_temp.wav")
+    record_audio_native(temp_wav, duration)
+    try:
+        if not os.path.exists(temp_wav):
+            return b""
+        with open(temp_wav, "rb") as f:
+            return f.read()
+    finally:
+        if os.path.exists(temp_wav):
+            os.remove(temp_wav)
+
 def record_and_transcribe(duration: int = 10) -> str:
     """Record audio and transcribe it using Gemini 2.0 Flash (audio understanding)."""
-    temp_wav = os.path.join(os.getcwd(), "meeting_temp.wav")
     t0 = time.time()
     
     try:
-        # 1. Record audio
-        record_audio_native(temp_wav, duration)
+        # 1. Record audio (always in-memory bytes from here on).
+        audio_content = record_audio(duration)
         t1 = time.time()
         print(f"[DEBUG] Audio Recording ({duration}s) took: {t1-t0:.2f}s")
-        
-        if not os.path.exists(temp_wav) or os.path.getsize(temp_wav) < 1000:
-             return "Recording failed: Audio file was not created or is too small."
 
-        # 2. Read WAV file and encode to base64
-        with open(temp_wav, "rb") as audio_file:
-            audio_content = audio_file.read()
-            
-        import base64
-        audio_base64 = base64.b64encode(audio_content).decode('utf-8')
-        t2 = time.time()
-        print(f"[DEBUG] File Read & Base64 took: {t2-t1:.2f}s")
-        
-        # 3. Use Gemini to transcribe the audio
+        if len(audio_content) < 1000:
+            return "Recording failed: recording is empty or too small."
+
+        # 2. Use Gemini to transcribe the audio
         api_key = os.getenv("GOOGLE_API_KEY")
-        
+
         if not api_key:
-            if os.path.exists(temp_wav):
-                os.remove(temp_wav)
             return "No GOOGLE_API_KEY found. Speech recognition requires an API key."
-        
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash-exp:generateContent?key={api_key}"
+
+        try:
+            audio_part = {
+                "file_data": {
+                    "mime_type": "audio/wav",
+                    "file_uri": _upload_audio_raw(audio_content, api_key),
+                }
+            }
+        except Exception:
+            # Files API unreachable or rejected: inline the audio instead.
+            import base64
+            audio_part = {
+                "inline_data": {
+                    "mime_type": "audio/wav",
+                    "data": base64.b64encode(audio_content).decode("utf-8"),
+                }
+            }
+        t2 = time.time()
+        print(f"[DEBUG] Audio Upload took: {t2-t1:.2f}s")
         
         payload = {
             "contents": [{
@@ -216,27 +587,20 @@ def record_and_transcribe(duration: int = 10) -> str:
 4. If the audio is not in English, translate it to English in parentheses e.g. "Hola (Hello)".
 5. Only output the final text. Do not add commentary."""
                     },
-                    {
-                        "inline_data": {
-                            "mime_type": "audio/wav",
-                            "data": audio_base64
-                        }
-                    }
+                    audio_part
                 ]
             }]
         }
         
-        response = httpx.post(url, json=payload, timeout=30.0)
+        response = _HTTP.post(
+            _GEMINI_GENERATE_URL, params={"key": api_key}, json=payload, timeout=30.0
+        )
         t3 = time.time()
         print(f"[DEBUG] Transcription API took: {t3-t2:.2f}s | Total: {t3-t0:.2f}s")
         
         response.raise_for_status()
         result = response.json()
         
-        # Clean up
-        if os.path.exists(temp_wav):
-            os.remove(temp_wav)
-        
         # Extract transcript
         if 'candidates' in result and len(result['candidates']) > 0:
             transcript = result['candidates'][0]['content']['parts'][0]['text'].strip()
@@ -245,33 +609,28 @@ def record_and_transcribe(duration: int = 10) -> str:
             return "No speech detected. Please speak louder or closer to the microphone."
             
     except Exception as e:
-        if os.path.exists(temp_wav):
-            os.remove(temp_wav)
         return f"Meeting Assistant Error: {str(e)}"
 
 # --- AI MEETING INSIGHTS ---
 
-def analyze_transcript_with_ai(transcript: str) -> str:
-    """Use Google Gemini REST API to generate smart meeting responses and insights."""
-    try:
-        # Get API key from environment
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key:
-            return "⚠️ No GOOGLE_API_KEY found. Set it in your environment to enable AI insights.\n\nGet your free key at: https://aistudio.google.com/apikey"
-        
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash-exp:generateContent?key={api_key}"
-        
-        # Logic to adjust depth based on input length
-        is_short = len(transcript.split()) < 20
-        
-        if is_short:
-             prompt = f"""You are an elite AI Meeting Coach. 
+_GEMINI_GENERATE_URL = (
+    _GEMINI_BASE + "/v1beta/models/gemini-2.0-flash-exp:generateContent"
+)
+
+
+def _analysis_payload(transcript: str) -> Dict[str, Any]:
+    """Build the generateContent payload for a meeting transcript."""
+    # Logic to adjust depth based on input length
+    is_short = len(transcript.split()) < 20
+
+    if is_short:
+        prompt = f"""You are an elite AI Meeting Coach. 
 TRANSCRIPT: "{transcript}"
 
 The user said something short. Provide a single, brilliant "PERFECT RESPONSE" to keep the flow. 
 Do not give analysis or questions unless absolutely necessary. Be extremely concise."""
-        else:
-            prompt = f"""You are an elite AI Meeting Coach (like Hedy AI). 
+    else:
+        prompt = f"""You are an elite AI Meeting Coach (like Hedy AI). 
 Your goal is to help me WIN this meeting. Don't just summarize. 
 Analyze the dynamic, detect hidden concerns, and give me strategic advantages using the transcript below.
 
@@ -285,25 +644,105 @@ Provide 3 specific sections:
 
 Keep it short, punchy, and actionable. I am in the meeting right now."""
 
-        payload = {
-            "contents": [{
-                "parts": [{"text": prompt}]
-            }]
-        }
-        
-        response = httpx.post(url, json=payload, timeout=30.0)
-        t1 = time.time()
-        print(f"[DEBUG] Gemini Analysis took: {t1-t0:.2f}s")
-        
+    return {"contents": [{"parts": [{"text": prompt}]}]}
+
+
+def _gemini_text(data: Dict[str, Any]) -> str:
+    if data.get("candidates"):
+        return data["candidates"][0]["content"]["parts"][0]["text"]
+    return "AI returned no response. Please try again."
+
+
+_NO_KEY_MSG = ("⚠️ No GOOGLE_API_KEY found. Set it in your environment to enable AI insights."
+               "\n\nGet your free key at: https://aistudio.google.com/apikey")
+
+
+def analyze_transcript_with_ai(transcript: str) -> str:
+    """Use Google Gemini REST API to generate smart meeting responses and insights."""
+    try:
+        api_key = os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            return _NO_KEY_MSG
+
+        t0 = time.time()
+        response = _HTTP.post(
+            _GEMINI_GENERATE_URL,
+            params={"key": api_key},
+            json=_analysis_payload(transcript),
+            timeout=30.0,
+        )
+        print(f"[DEBUG] Gemini Analysis took: {time.time()-t0:.2f}s")
+
         response.raise_for_status()
-        data = response.json()
-        
-        if 'candidates' in data and len(data['candidates']) > 0:
-            text = data['candidates'][0]['content']['parts'][0]['text']
-            return text
-        else:
-            return "AI returned no response. Please try again."
-        
+        return _gemini_text(response.json())
+
     except Exception as e:
         print(f"[DEBUG] Analysis Error: {e}")
         return f"AI Analysis Error: {str(e)}"
+
+
+async def analyze_transcript_with_ai_async(transcript: str) -> str:
+    """Async analyze path on the shared AsyncClient.
+
+    Concurrent meeting sessions multiplex over one HTTP/2 connection
+    instead of each blocking a worker thread on its own handshake.
+    """
+    try:
+        api_key = os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            return _NO_KEY_MSG
+
+        response = await _HTTP_ASYNC.post(
+            _GEMINI_GENERATE_URL,
+            params={"key": api_key},
+            json=_analysis_payload(transcript),
+            timeout=30.0,
+        )
+        response.raise_for_status()
+        return _gemini_text(response.json())
+    except Exception as e:
+        return f"AI Analysis Error: {str(e)}"
+
+# --- CONCURRENT TOOL FAN-OUT ---
+
+# Tools with a native-async variant; everything else is offloaded to a
+# worker thread. Deliberately no aiofiles: plain stdlib IO behind
+# asyncio.to_thread is faster than wrapped async file IO for these sizes.
+_ASYNC_TOOLS = {
+    "browse_web": browse_web_async,
+    "ai_analyze": analyze_transcript_with_ai_async,
+}
+
+_SYNC_TOOLS = {
+    "browse_web": browse_web,
+    "create_excel": create_excel,
+    "create_excel_columnar": create_excel_columnar,
+    "create_word": create_word,
+    "create_pdf": create_pdf,
+    "execute_python": execute_python_code,
+    "search_past_actions": search_audit_logs,
+    "search_google_drive": search_google_drive,
+    "listen_to_meeting": record_and_transcribe,
+}
+
+async def aclose_clients() -> None:
+    """Close the shared AsyncClient (await-only, so the control-plane app
+    calls this from its shutdown hook; the sync client closes via atexit)."""
+    await _HTTP_ASYNC.aclose()
+
+async def run_tools(specs: List[Dict[str, Any]]) -> List[Any]:
+    """Run several tool calls concurrently and return results in order.
+
+    Each spec is {"tool": <name>, "args": {...}}. I/O-bound tools with an
+    async variant run directly on the loop; the rest run on worker threads,
+    so a batch of five fetches costs one round-trip instead of five.
+    """
+    async def _one(spec: Dict[str, Any]):
+        name = spec["tool"]
+        args = spec.get("args", {})
+        fn = _ASYNC_TOOLS.get(name)
+        if fn is not None:
+            return await fn(**args)
+        return await asyncio.to_thread(_SYNC_TOOLS[name], **args)
+
+    return await asyncio.gather(*(_one(s) for s in specs))
@@ -2,10 +2,38 @@ from __future__ import annotations
 
 import os
 import json
+import mmap
 import time
 import base64
 import hashlib
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple
+
+# SIMD-accelerated base64 when installed; stdlib otherwise.
+try:
+    import pybase64
+except ImportError:
+    pybase64 = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _canon(obj: Any) -> bytes:
+    """Canonical (sorted-key, compact) JSON bytes for hashing and audit."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(obj, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def _dumps(obj: Any) -> bytes:
+    """Compact JSON bytes; orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
 
 
 class FSAccessError(Exception):
@@ -16,110 +44,283 @@ def _real(path: str) -> str:
     return os.path.realpath(path)
 
 
+@lru_cache(maxsize=4096)
+def _resolve_roots(roots: tuple) -> tuple:
+    """Realpath every root once per distinct root set.
+
+    Root sets repeat across the calls of a job (execute_plan enforces per
+    move), so caching turns O(moves * roots) realpath walks into O(roots).
+    """
+    return tuple(_real(r) for r in roots)
+
+
 def enforce_within_roots(path: str, roots: List[str]) -> str:
     rp = _real(path)
-    rroots = [_real(r) for r in roots]
+    rroots = _resolve_roots(tuple(roots))
     if not any(rp == rr or rp.startswith(rr + os.sep) for rr in rroots):
         raise FSAccessError(f"Path is outside allowed roots: {path}")
     return rp
 
 
+# Files larger than this are hashed through an mmap view: hashlib reads
+# straight from the page cache with no per-chunk bytes allocation.
+_MMAP_HASH_THRESHOLD = 4 * 1024 * 1024
+
+
 def sha256_file(path: str, max_bytes: int = 25_000_000) -> str:
-    h = hashlib.sha256()
+    # usedforsecurity=False: these are integrity checksums, and it lets
+    # hashlib pick the fastest OpenSSL implementation available.
+    h = hashlib.sha256(usedforsecurity=False)
     with open(path, "rb") as f:
-        total = 0
-        while True:
-            chunk = f.read(1024 * 1024)
+        cap = min(os.fstat(f.fileno()).st_size, max_bytes)
+        if cap > _MMAP_HASH_THRESHOLD:
+            try:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    h.update(memoryview(mm)[:cap])
+                    return h.hexdigest()
+            except (ValueError, OSError):
+                pass  # unmappable (e.g. locked on Windows); chunk instead
+        remaining = cap
+        while remaining > 0:
+            chunk = f.read(min(1024 * 1024, remaining))
             if not chunk:
                 break
             h.update(chunk)
-            total += len(chunk)
-            if total > max_bytes:
-                break
+            remaining -= len(chunk)
     return h.hexdigest()
 
 
+class AuditWriter:
+    """Buffered appender for <workspace_root>/.coworker_audit.jsonl.
+
+    Root enforcement (two realpath walks) and the open happen once at
+    construction; events then land in a 64KB userspace buffer, so a plan
+    with N moves costs one open/close pair instead of N.
+
+    Flush policy: every ``flush_every`` events the buffer is pushed to the
+    kernel, so a crash mid-plan can lose at most that many audit records
+    for moves already applied. The default of 1 matches the durability of
+    the old open-write-close per event while still amortizing the open.
+    """
+
+    def __init__(self, roots: List[str], workspace_root: str, flush_every: int = 1):
+        workspace_root = enforce_within_roots(workspace_root, roots)
+        self.audit_path = os.path.join(workspace_root, ".coworker_audit.jsonl")
+        enforce_within_roots(self.audit_path, roots)
+        self._f = open(self.audit_path, "ab", buffering=1 << 16)
+        self._flush_every = max(1, flush_every)
+        self._pending = 0
+
+    def write(self, event: Dict[str, Any]) -> None:
+        e = dict(event)
+        e["ts_unix_ms"] = int(time.time() * 1000)
+        if orjson is not None:
+            self._f.write(
+                orjson.dumps(e, option=orjson.OPT_SORT_KEYS | orjson.OPT_APPEND_NEWLINE)
+            )
+        else:
+            self._f.write(_canon(e) + b"\n")
+        self._pending += 1
+        if self._pending >= self._flush_every:
+            self._f.flush()
+            self._pending = 0
+
+    def close(self) -> None:
+        self._f.close()
+
+    def __enter__(self) -> "AuditWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
 def write_audit_event(roots: List[str], workspace_root: str, event: Dict[str, Any]) -> None:
-    """Append-only JSONL audit file: <workspace_root>/.coworker_audit.jsonl"""
-    workspace_root = enforce_within_roots(workspace_root, roots)
-    audit_path = os.path.join(workspace_root, ".coworker_audit.jsonl")
-    enforce_within_roots(audit_path, roots)
+    """One-shot audit append; batch callers should hold an AuditWriter."""
+    with AuditWriter(roots, workspace_root) as w:
+        w.write(event)
 
-    e = dict(event)
-    e["ts_unix_ms"] = int(time.time() * 1000)
 
-    with open(audit_path, "a", encoding="utf-8") as f:
-        f.write(json.dumps(e, sort_keys=True) + "\n")
+def _walk_entries(root: str):
+    """Depth-first DirEntry generator built on os.scandir.
+
+    DirEntry caches entry type and stat from the directory read itself, so
+    a walk costs one readdir per directory instead of an extra stat syscall
+    per entry. Unreadable directories are skipped, matching os.walk's
+    default. Being a generator, callers can stop early at their item cap.
+    """
+    stack = [root]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    yield entry
+        except OSError:
+            continue
 
 
 def list_files(root: str, roots: List[str], max_items: int = 500) -> Dict[str, Any]:
     root = enforce_within_roots(root, roots)
     items = []
-    for dirpath, dirnames, filenames in os.walk(root):
-        for name in dirnames + filenames:
-            p = os.path.join(dirpath, name)
-            try:
-                st = os.stat(p)
-                items.append(
-                    {
-                        "path": p,
-                        "is_dir": os.path.isdir(p),
-                        "size": st.st_size,
-                        "mtime": int(st.st_mtime),
-                    }
-                )
-            except Exception:
-                continue
-            if len(items) >= max_items:
-                return {"truncated": True, "items": items}
+    for entry in _walk_entries(root):
+        try:
+            st = entry.stat(follow_symlinks=False)
+            items.append(
+                {
+                    "path": entry.path,
+                    "is_dir": entry.is_dir(follow_symlinks=False),
+                    "size": st.st_size,
+                    "mtime": int(st.st_mtime),
+                }
+            )
+        except Exception:
+            continue
+        if len(items) >= max_items:
+            return {"truncated": True, "items": items}
     return {"truncated": False, "items": items}
 
 
+def _sha256_or_none(path: str) -> Optional[str]:
+    try:
+        return sha256_file(path)
+    except Exception:
+        return None
+
+
 def scan_index(root: str, roots: List[str], hash_files: bool = False, max_items: int = 2000) -> Dict[str, Any]:
     root = enforce_within_roots(root, roots)
     indexed = []
-    for dirpath, _, filenames in os.walk(root):
-        for fn in filenames:
-            p = os.path.join(dirpath, fn)
+    truncated = False
+    for entry in _walk_entries(root):
+        if entry.is_dir(follow_symlinks=False):
+            continue
+        try:
+            st = entry.stat(follow_symlinks=False)
+        except Exception:
+            continue
+        indexed.append(
+            {
+                "path": entry.path,
+                "size": st.st_size,
+                "mtime": int(st.st_mtime),
+                "ext": os.path.splitext(entry.name)[1].lower(),
+            }
+        )
+        if len(indexed) >= max_items:
+            truncated = True
+            break
+
+    if hash_files and indexed:
+        # hashlib releases the GIL, so a thread pool hashes files on all
+        # cores while their reads overlap; a file that vanished mid-scan
+        # simply gets no sha256 field.
+        with ThreadPoolExecutor(max_workers=min(32, os.cpu_count() or 4)) as ex:
+            digests = ex.map(_sha256_or_none, [r["path"] for r in indexed], chunksize=16)
+            for rec, digest in zip(indexed, digests):
+                if digest is not None:
+                    rec["sha256"] = digest
+
+    return {"truncated": truncated, "files": indexed}
+
+
+def scan_index_to_writer(
+    root: str,
+    roots: List[str],
+    writer,
+    hash_files: bool = False,
+    max_items: int = 2000,
+    window: int = 256,
+) -> None:
+    """Streaming scan_index: serialize the index straight into ``writer``.
+
+    ``writer`` is a callable accepting bytes (e.g. ``BytesIO.write``).
+    Records are collected, hashed and encoded in bounded windows, so neither
+    the full record list nor the full JSON payload is ever held in memory —
+    peak usage is one window regardless of scan size. The emitted document
+    is the same shape as scan_index's, with ``files`` before ``truncated``.
+    """
+    root = enforce_within_roots(root, roots)
+    pool = (
+        ThreadPoolExecutor(max_workers=min(32, os.cpu_count() or 4)) if hash_files else None
+    )
+    batch: List[Dict[str, Any]] = []
+    first = True
+
+    def _flush() -> None:
+        nonlocal first
+        if pool is not None and batch:
+            digests = pool.map(_sha256_or_none, [r["path"] for r in batch], chunksize=16)
+            for rec, digest in zip(batch, digests):
+                if digest is not None:
+                    rec["sha256"] = digest
+        for rec in batch:
+            if first:
+                first = False
+            else:
+                writer(b",")
+            writer(_dumps(rec))
+        batch.clear()
+
+    truncated = False
+    total = 0
+    writer(b'{"files":[')
+    try:
+        for entry in _walk_entries(root):
+            if entry.is_dir(follow_symlinks=False):
+                continue
             try:
-                st = os.stat(p)
-                rec = {
-                    "path": p,
+                st = entry.stat(follow_symlinks=False)
+            except Exception:
+                continue
+            batch.append(
+                {
+                    "path": entry.path,
                     "size": st.st_size,
                     "mtime": int(st.st_mtime),
-                    "ext": os.path.splitext(fn)[1].lower(),
+                    "ext": os.path.splitext(entry.name)[1].lower(),
                 }
-                if hash_files:
-                    rec["sha256"] = sha256_file(p)
-                indexed.append(rec)
-            except Exception:
-                continue
-            if len(indexed) >= max_items:
-                return {"truncated": True, "files": indexed}
-    return {"truncated": False, "files": indexed}
+            )
+            total += 1
+            if total >= max_items:
+                truncated = True
+                break
+            if len(batch) >= window:
+                _flush()
+        _flush()
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    writer(b'],"truncated":' + (b"true" if truncated else b"false") + b"}")
 
 
 def plan_sha256(plan: Dict[str, Any]) -> str:
-    b = json.dumps(plan, sort_keys=True, separators=(",", ":")).encode("utf-8")
-    return hashlib.sha256(b).hexdigest()
+    return hashlib.sha256(_canon(plan), usedforsecurity=False).hexdigest()
 
 
 def propose_organize_plan(root: str, roots: List[str], policy: str = "by_ext") -> Dict[str, Any]:
     """Dry-run move plan: list of {from,to}."""
     root = enforce_within_roots(root, roots)
     plan = []
-    for dirpath, _, filenames in os.walk(root):
-        for fn in filenames:
-            src = os.path.join(dirpath, fn)
-            ext = os.path.splitext(fn)[1].lower().lstrip(".") or "no_ext"
-            dest_dir = os.path.join(root, ext) if policy == "by_ext" else os.path.join(root, "misc")
-            dest = os.path.join(dest_dir, fn)
-            if _real(src) != _real(dest):
-                plan.append({"from": src, "to": dest})
-
-    plan_obj = {"policy": policy, "count": len(plan), "moves": plan}
-    plan_obj["plan_hash"] = plan_sha256(plan_obj)
-    return plan_obj
+    # Hash incrementally as moves are generated instead of re-serializing
+    # the finished plan: each move feeds its canonical JSON line into the
+    # digest, and policy/count are mixed in at the ends.
+    h = hashlib.sha256(policy.encode("utf-8"), usedforsecurity=False)
+    for entry in _walk_entries(root):
+        if entry.is_dir(follow_symlinks=False):
+            continue
+        fn = entry.name
+        ext = os.path.splitext(fn)[1].lower().lstrip(".") or "no_ext"
+        dest_dir = os.path.join(root, ext) if policy == "by_ext" else os.path.join(root, "misc")
+        dest = os.path.join(dest_dir, fn)
+        if _real(entry.path) != _real(dest):
+            m = {"from": entry.path, "to": dest}
+            plan.append(m)
+            h.update(_canon(m))
+
+    h.update(str(len(plan)).encode("ascii"))
+    return {"policy": policy, "count": len(plan), "moves": plan, "plan_hash": h.hexdigest()}
 
 
 def execute_plan(plan: Dict[str, Any], roots: List[str], workspace_root: str) -> Dict[str, Any]:
@@ -127,51 +328,61 @@ def execute_plan(plan: Dict[str, Any], roots: List[str], workspace_root: str) ->
     workspace_root = enforce_within_roots(workspace_root, roots)
 
     applied, skipped, errors = 0, 0, []
-    for m in plan.get("moves", []):
-        src = m["from"]
-        dst = m["to"]
-        try:
-            enforce_within_roots(src, roots)
-            enforce_within_roots(dst, roots)
+    with AuditWriter(roots, workspace_root) as audit:
+        for m in plan.get("moves", []):
+            src = m["from"]
+            dst = m["to"]
+            try:
+                enforce_within_roots(src, roots)
+                enforce_within_roots(dst, roots)
 
-            if not os.path.exists(src):
-                skipped += 1
-                continue
+                if not os.path.exists(src):
+                    skipped += 1
+                    continue
 
-            os.makedirs(os.path.dirname(dst), exist_ok=True)
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
 
-            if os.path.exists(dst):
-                skipped += 1
-                continue
+                if os.path.exists(dst):
+                    skipped += 1
+                    continue
 
-            os.rename(src, dst)
-            applied += 1
+                os.rename(src, dst)
+                applied += 1
 
-            write_audit_event(roots, workspace_root, {"action": "move", "from": src, "to": dst})
-        except Exception as e:
-            errors.append({"from": src, "to": dst, "error": str(e)})
+                audit.write({"action": "move", "from": src, "to": dst})
+            except Exception as e:
+                errors.append({"from": src, "to": dst, "error": str(e)})
 
     return {"applied": applied, "skipped": skipped, "errors": errors}
 
 
 def read_file_safe(path: str, roots: List[str], max_bytes: int = 1_000_000) -> Dict[str, Any]:
+    """Capped read of a file inside the allowed roots.
+
+    Intentionally synchronous stdlib IO: async callers should hop it onto a
+    thread (asyncio.to_thread) instead of introducing an async-file wrapper,
+    which costs more than the thread hop for single reads.
+    """
     path = enforce_within_roots(path, roots)
 
     if os.path.isdir(path):
         raise FSAccessError("Path is a directory, not a file")
 
-    size = os.path.getsize(path)
-    to_read = min(size, max_bytes)
-
     with open(path, "rb") as f:
-        data = f.read(to_read)
-
+        # fstat on the open handle avoids a second path walk, and readinto
+        # a pre-sized bytearray skips the growable-buffer copies of read().
+        size = os.fstat(f.fileno()).st_size
+        to_read = min(size, max_bytes)
+        buf = bytearray(to_read)
+        n = f.readinto(buf)
+
+    encode = base64.b64encode if pybase64 is None else pybase64.b64encode
     return {
         "path": path,
         "size": size,
-        "read_bytes": len(data),
+        "read_bytes": n,
         "truncated": size > max_bytes,
-        "data_base64": base64.b64encode(data).decode("ascii"),
+        "data_base64": encode(memoryview(buf)[:n]).decode("ascii"),
     }
 
 
@@ -215,3 +426,83 @@ def restore_from_trash(trash_item_path: str, restore_to: str, roots: List[str],
     write_audit_event(roots, workspace_root, {"action": "restore", "from": trash_item_path, "to": restore_to})
 
     return {"restored": True, "from": trash_item_path, "to": restore_to}
+
+
+def soft_delete_many(
+    paths: List[str], roots: List[str], workspace_root: str
+) -> List[Dict[str, Any]]:
+    """Batched soft_delete: one trash-dir create and one audit handle for
+    the whole batch instead of one per file. Returns a result dict per
+    input path, in order; per-item failures don't abort the batch."""
+    workspace_root = enforce_within_roots(workspace_root, roots)
+    trash_dir = os.path.join(workspace_root, ".trash")
+    os.makedirs(trash_dir, exist_ok=True)
+
+    results: List[Dict[str, Any]] = []
+    with AuditWriter(roots, workspace_root) as audit:
+        for path in paths:
+            # Root violations carry an "error" key so callers can fail the
+            # item exactly as a solo soft_delete's FSAccessError would,
+            # without one bad path aborting the batch's siblings.
+            try:
+                path = enforce_within_roots(path, roots)
+                if not os.path.exists(path):
+                    results.append({"deleted": False, "reason": "not_found", "path": path})
+                    continue
+
+                base = os.path.basename(path)
+                now = int(time.time() * 1000)
+                dst = os.path.join(trash_dir, f"{base}.{now}")
+                # Same-named files trashed within one millisecond need a suffix.
+                seq = 0
+                while os.path.exists(dst):
+                    seq += 1
+                    dst = os.path.join(trash_dir, f"{base}.{now}.{seq}")
+
+                enforce_within_roots(dst, roots)
+            except FSAccessError as e:
+                results.append({"deleted": False, "error": str(e), "path": path})
+                continue
+            os.rename(path, dst)
+            audit.write({"action": "soft_delete", "from": path, "to": dst})
+            results.append({"deleted": True, "from": path, "to": dst})
+    return results
+
+
+def restore_from_trash_many(
+    items: List[Tuple[str, str]], roots: List[str], workspace_root: str
+) -> List[Dict[str, Any]]:
+    """Batched restore: ``items`` is (trash_item_path, restore_to) pairs.
+    One audit handle for the batch; per-item failures don't abort it."""
+    workspace_root = enforce_within_roots(workspace_root, roots)
+
+    results: List[Dict[str, Any]] = []
+    with AuditWriter(roots, workspace_root) as audit:
+        for trash_item_path, restore_to in items:
+            try:
+                trash_item_path = enforce_within_roots(trash_item_path, roots)
+                restore_to = enforce_within_roots(restore_to, roots)
+            except FSAccessError as e:
+                # "error" key: callers fail the item like a solo restore's
+                # FSAccessError, instead of reporting a clean refusal.
+                results.append(
+                    {"restored": False, "error": str(e), "trash_item": trash_item_path}
+                )
+                continue
+            if not os.path.exists(trash_item_path):
+                results.append(
+                    {"restored": False, "reason": "not_found", "trash_item": trash_item_path}
+                )
+                continue
+
+            os.makedirs(os.path.dirname(restore_to), exist_ok=True)
+            if os.path.exists(restore_to):
+                results.append(
+                    {"restored": False, "reason": "destination_exists", "restore_to": restore_to}
+                )
+                continue
+
+            os.rename(trash_item_path, restore_to)
+            audit.write({"action": "restore", "from": trash_item_path, "to": restore_to})
+            results.append({"restored": True, "from": trash_item_path, "to": restore_to})
+    return results
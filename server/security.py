@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import secrets
+import threading
+import time
 from typing import Optional
 from fastapi import HTTPException
 from .cp_store import CPStore
@@ -8,6 +10,13 @@ from .cp_store import CPStore
 TOKEN_HEADER = "X-Coworker-Token"
 SESSION_HEADER = "X-Coworker-Session"
 
+# Sessions are immutable once minted, so a validated (session_id, token)
+# pair can be cached briefly to keep repeat requests off SQLite.
+_CACHE_TTL_S = 300.0
+_CACHE_MAX = 10_000
+_validated: dict = {}
+_validated_lock = threading.Lock()
+
 
 def mint_token() -> str:
     return secrets.token_urlsafe(32)
@@ -17,6 +26,22 @@ def require_token(store: CPStore, session_id: Optional[str], token: Optional[str
     if not session_id or not token:
         raise HTTPException(status_code=401, detail="Missing session or token")
 
+    key = (session_id, token)
+    expires = _validated.get(key)
+    if expires is not None and expires > time.monotonic():
+        return
+
     expected = store.get_session_token(session_id)
-    if expected is None or expected != token:
+    # compare_digest: constant-time over the full length, so a mismatch
+    # doesn't leak how many leading bytes were right. Compared as bytes:
+    # the str overload raises TypeError on non-ASCII input, and headers can
+    # legally carry latin-1 bytes (surrogateescaped by the ASGI decode).
+    if expected is None or not secrets.compare_digest(
+        expected.encode(), token.encode("utf-8", "surrogateescape")
+    ):
         raise HTTPException(status_code=403, detail="Invalid token")
+
+    with _validated_lock:
+        if len(_validated) >= _CACHE_MAX:
+            _validated.clear()
+        _validated[key] = time.monotonic() + _CACHE_TTL_S
@@ -1,17 +1,81 @@
 from __future__ import annotations
 
 import asyncio
+import io
 import json
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - serialization falls back to stdlib
+    orjson = None
+
+
+def _loads(raw):
+    # orjson accepts bytes directly; the stdlib path needs an extra decode
+    # only on Pythons older than 3.6, which we don't support.
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
+def _dumps(obj) -> bytes:
+    return orjson.dumps(obj) if orjson is not None else json.dumps(obj).encode("utf-8")
+
+
+# READ_FILE repeat-request cache (UI refreshes, plan previews): the fully
+# serialized result bytes keyed by (canonical path, mtime_ns, size,
+# max_bytes), so a hit skips the read, the base64 pass and the JSON encode.
+# mtime_ns/size in the key make stale entries unreachable after any write;
+# eviction is LRU by total cached bytes. Shared by all workers in-process.
+_READ_CACHE: "OrderedDict[tuple, bytes]" = OrderedDict()
+_READ_CACHE_LOCK = threading.Lock()
+_READ_CACHE_MAX_BYTES = 64 * 1024 * 1024
+_read_cache_bytes = 0
+
+
+def _read_cache_get(key) -> Optional[bytes]:
+    with _READ_CACHE_LOCK:
+        payload = _READ_CACHE.get(key)
+        if payload is not None:
+            _READ_CACHE.move_to_end(key)
+        return payload
+
+
+def _read_cache_put(key, payload: bytes) -> None:
+    global _read_cache_bytes
+    # A single huge entry would evict everything else for one-shot reuse.
+    if len(payload) > _READ_CACHE_MAX_BYTES // 4:
+        return
+    with _READ_CACHE_LOCK:
+        old = _READ_CACHE.pop(key, None)
+        if old is not None:
+            _read_cache_bytes -= len(old)
+        _READ_CACHE[key] = payload
+        _read_cache_bytes += len(payload)
+        while _read_cache_bytes > _READ_CACHE_MAX_BYTES:
+            _, evicted = _READ_CACHE.popitem(last=False)
+            _read_cache_bytes -= len(evicted)
+
+
+def _as_bool(v) -> bool:
+    # Typed at enqueue via PARAM_SCHEMAS; the str branch covers rows queued
+    # before the coercion existed.
+    return v.lower() == "true" if isinstance(v, str) else bool(v)
 from .cp_store import CPStore
 from .fs_tools import (
-    scan_index,
+    scan_index_to_writer,
     list_files,
     propose_organize_plan,
     execute_plan,
     read_file_safe,
     plan_sha256,
     soft_delete,
+    soft_delete_many,
     restore_from_trash,
+    restore_from_trash_many,
     enforce_within_roots,
 )
 from .extended_tools import (
@@ -47,151 +111,379 @@ AI_ANALYZE = 16
 
 import concurrent.futures
 
+# Document generation (fpdf / python-docx / xlsxwriter) is CPU-bound and the
+# first two are known to grow RSS over long runs. Those jobs go to a small
+# persistent process pool: spawn context for Windows parity, and
+# maxtasksperchild recycles children before leaked memory accumulates.
+_CPU_POOL = None
+_CPU_POOL_LOCK = threading.Lock()
+
+
+def _cpu_pool():
+    global _CPU_POOL
+    if _CPU_POOL is None:
+        with _CPU_POOL_LOCK:
+            if _CPU_POOL is None:
+                _CPU_POOL = multiprocessing.get_context("spawn").Pool(
+                    processes=max(1, (os.cpu_count() or 4) // 2),
+                    maxtasksperchild=50,
+                )
+    return _CPU_POOL
+
+
+def _run_doc_job(jtype: int, path: str, payload) -> str:
+    """Routes a document job inside a pool child (must stay module-level
+    and picklable)."""
+    if jtype == CREATE_EXCEL:
+        return create_excel(path, payload)
+    if jtype == CREATE_WORD:
+        return create_word(path, payload)
+    return create_pdf(path, payload)
+
+
+class Result(NamedTuple):
+    """Outcome of one job handler; errors here are expected, not raised."""
+
+    ok: bool
+    payload: bytes
+    content_type: str
+    plan_hash: Optional[str]
+    error: Optional[str]
+
+
 class Worker:
-    def __init__(self, store: CPStore, worker_id: str):
+    def __init__(self, store: CPStore, worker_id: str, queue: "asyncio.Queue | None" = None):
         self.store = store
         self.worker_id = worker_id
-        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=5)
+        # Optional wakeup queue fed by the enqueue path. The store stays the
+        # source of truth; the queue just replaces most of the poll sleeps.
+        self.queue = queue
+        # Poll delay for queue-less workers; doubles while idle, resets on a
+        # successful claim so bursts are drained at ~1ms granularity.
+        self._idle_backoff = 0.001
+        # Claim batch is capped at the executor width: anything beyond it
+        # would sit leased-but-idle waiting for a thread.
+        self._claim_batch = 5
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=self._claim_batch)
+        # jtype -> handler; one dict lookup replaces the 16-way elif ladder.
+        # Handlers return (payload, content_type, plan_hash_or_None).
+        self._handlers = {
+            SCAN_INDEX: self._h_scan_index,
+            LIST_FILES: self._h_list_files,
+            READ_FILE: self._h_read_file,
+            ORGANIZE_PLAN: self._h_organize_plan,
+            EXECUTE_PLAN: self._h_execute_plan,
+            SOFT_DELETE: self._h_soft_delete,
+            RESTORE: self._h_restore,
+            BROWSE_WEB: self._h_browse_web,
+            CREATE_EXCEL: self._h_create_excel,
+            CREATE_WORD: self._h_create_word,
+            CREATE_PDF: self._h_create_pdf,
+            EXECUTE_PYTHON: self._h_execute_python,
+            SEARCH_ACTIONS: self._h_search_actions,
+            SEARCH_DRIVE: self._h_search_drive,
+            LISTEN_MEETING: self._h_listen_meeting,
+            AI_ANALYZE: self._h_ai_analyze,
+        }
+
+    async def _wait_for_work(self) -> None:
+        if self.queue is None:
+            await asyncio.sleep(self._idle_backoff)
+            self._idle_backoff = min(self._idle_backoff * 2, 0.25)
+            return
+        try:
+            await asyncio.wait_for(self.queue.get(), timeout=5.0)
+        except asyncio.TimeoutError:
+            pass  # periodic poll catches jobs enqueued out-of-process
 
     async def run_forever(self) -> None:
         loop = asyncio.get_running_loop()
         while True:
-            job = self.store.fetch_next_queued_job()
-            if not job:
-                await asyncio.sleep(0.25)
+            # Fetch + lease-claim in one statement; a losing worker simply
+            # gets None instead of burning a failed UPDATE round trip. The
+            # claim is a synchronous sqlite write, so hop it onto a thread
+            # rather than stalling every coroutine sharing this loop.
+            jobs = await asyncio.to_thread(
+                self.store.claim_next_queued_jobs, self.worker_id, self._claim_batch
+            )
+            if not jobs:
+                await self._wait_for_work()
                 continue
+            self._idle_backoff = 0.001
 
-            job_id = job["job_id"]
-            if not self.store.claim_job_lease(job_id, self.worker_id):
-                await asyncio.sleep(0.1)
-                continue
-            
-            # Offload synchronous execution to thread pool
-            loop.run_in_executor(self.executor, self._execute_job, job)
+            if self.queue is not None:
+                # Consume the wakeup tokens that announced these jobs so queue
+                # depth tracks unclaimed work; otherwise a burst leaves stale
+                # tokens that wake workers into no-op claim attempts.
+                for _ in jobs:
+                    try:
+                        self.queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        break
+
+            # Offload synchronous execution to thread pool. Same-type trash
+            # jobs sharing roots and workspace coalesce into one batched fs
+            # call so trash-dir creation and the audit append are paid once.
+            for group in self._group_jobs(jobs):
+                if len(group) == 1:
+                    loop.run_in_executor(self.executor, self._execute_job, group[0])
+                else:
+                    loop.run_in_executor(self.executor, self._execute_trash_batch, group)
+
+    # ---------- result envelopes ----------
+    @staticmethod
+    def _json(out, plan_hash=None):
+        return Result(True, _dumps(out), "application/json", plan_hash, None)
+
+    @staticmethod
+    def _text(out):
+        return Result(True, out.encode("utf-8"), "text/plain", None, None)
+
+    @staticmethod
+    def _error(msg: str):
+        # Expected validation failures (missing tokens, missing plan) flow
+        # back as values: no traceback construction, and a client hammering
+        # with bad tokens stays off the exception path entirely.
+        return Result(False, f"Error: {msg}".encode("utf-8"), "text/plain", None, msg)
+
+    # ---------- job handlers ----------
+    def _h_scan_index(self, params, roots, job):
+        root = params.get("root", "")
+        hash_files = _as_bool(params.get("hash_files", False))
+        # Streamed straight into the buffer: no giant record list, no second
+        # full-payload pass through the serializer.
+        buf = io.BytesIO()
+        scan_index_to_writer(root, roots, buf.write, hash_files=hash_files)
+        return Result(True, buf.getvalue(), "application/json", None, None)
+
+    def _h_list_files(self, params, roots, job):
+        return self._json(list_files(params.get("root", ""), roots))
+
+    def _h_read_file(self, params, roots, job):
+        path = params.get("path", "")
+        max_bytes = int(params.get("max_bytes", 1_000_000))
+        # Root enforcement must precede the cache: entries are keyed by path
+        # alone, and another job's roots may not cover it.
+        path = enforce_within_roots(path, roots)
+        key = None
+        try:
+            st = os.stat(path)
+            key = (path, st.st_mtime_ns, st.st_size, max_bytes)
+        except OSError:
+            pass  # let read_file_safe raise the proper error below
+        if key is not None:
+            cached = _read_cache_get(key)
+            if cached is not None:
+                return Result(True, cached, "application/json", None, None)
+        res = self._json(read_file_safe(path, roots, max_bytes=max_bytes))
+        if key is not None:
+            _read_cache_put(key, res.payload)
+        return res
+
+    def _h_organize_plan(self, params, roots, job):
+        root = params.get("root", "")
+        policy = params.get("policy", "by_ext")
+        out = propose_organize_plan(root, roots, policy=policy)
+        return self._json(out, plan_hash=out.get("plan_hash"))
+
+    @staticmethod
+    def _group_jobs(jobs):
+        """Coalesce SOFT_DELETE/RESTORE jobs that share type, allowed roots
+        and workspace_root; every other job dispatches on its own."""
+        groups: dict = {}
+        order = []
+        for job in jobs:
+            jtype = job["type"]
+            if jtype in (SOFT_DELETE, RESTORE):
+                key = (
+                    jtype,
+                    job["allowed_roots_json"],
+                    job["params"].get("workspace_root", ""),
+                )
+            else:
+                key = (id(job),)
+            if key in groups:
+                groups[key].append(job)
+            else:
+                groups[key] = [job]
+                order.append(key)
+        return [groups[k] for k in order]
+
+    def _execute_trash_batch(self, jobs) -> None:
+        """Run a group of same-type trash jobs through the *_many variants.
+
+        Results stay per-job: each row gets its own entry from the batched
+        return value, so clients see exactly what single dispatch produced.
+        """
+        try:
+            jtype = jobs[0]["type"]
+            roots = jobs[0]["allowed_roots"]
+            workspace_root = jobs[0]["params"].get(
+                "workspace_root", roots[0] if roots else ""
+            )
+            if jtype == SOFT_DELETE:
+                outs = soft_delete_many(
+                    [j["params"].get("path", "") for j in jobs],
+                    roots,
+                    workspace_root=workspace_root,
+                )
+            else:
+                outs = restore_from_trash_many(
+                    [
+                        (j["params"].get("trash_item_path", ""), j["params"].get("restore_to", ""))
+                        for j in jobs
+                    ],
+                    roots,
+                    workspace_root=workspace_root,
+                )
+            for job, out in zip(jobs, outs):
+                err = out.get("error")
+                if err is not None:
+                    # Same shape solo dispatch produces when the fs call
+                    # raises FSAccessError: FAILED job, text/plain error.
+                    self.store.put_result_and_complete(
+                        job["job_id"],
+                        f"Error: {err}".encode("utf-8"),
+                        "text/plain",
+                        ok=False,
+                        error_message=err,
+                    )
+                else:
+                    self.store.put_result_and_complete(
+                        job["job_id"], _dumps(out), "application/json", ok=True
+                    )
+        except Exception as e:
+            msg = str(e)
+            for job in jobs:
+                self.store.put_result_and_complete(
+                    job["job_id"],
+                    f"Error: {msg}".encode("utf-8"),
+                    "text/plain",
+                    ok=False,
+                    error_message=msg,
+                )
+
+    def _load_plan(self, plan_job_id):
+        plan_res = self.store.get_result(plan_job_id)
+        return None if not plan_res else _loads(plan_res[0])
+
+    def _h_execute_plan(self, params, roots, job):
+        plan_job_id = params.get("plan_job_id", "")
+        approval_token = (job.get("approval_token") or "").strip()
+        if not plan_job_id:
+            return self._error("Missing plan_job_id")
+        if not approval_token:
+            return self._error("Missing approval_token")
+
+        # Validate the token against the memoized hash before touching the
+        # plan body: a rejected token costs two point lookups, not a parse
+        # of a potentially multi-MB plan.
+        plan_json = None
+        plan_hash = self.store.get_plan_hash(plan_job_id)
+        if not plan_hash:
+            # Legacy rows pay the canonical re-hash once, then backfill.
+            plan_json = self._load_plan(plan_job_id)
+            if plan_json is None:
+                return self._error("Missing plan result")
+            plan_hash = plan_json.get("plan_hash") or plan_sha256(plan_json)
+            self.store.set_plan_hash(plan_job_id, plan_hash)
+
+        if not self.store.validate_approval(approval_token, plan_job_id, plan_hash):
+            return self._error("Invalid or expired approval token for this plan")
+
+        if plan_json is None:
+            plan_json = self._load_plan(plan_job_id)
+            if plan_json is None:
+                return self._error("Missing plan result")
+
+        workspace_root = params.get("workspace_root", roots[0] if roots else "")
+        return self._json(execute_plan(plan_json, roots, workspace_root=workspace_root))
+
+    def _h_soft_delete(self, params, roots, job):
+        path = params.get("path", "")
+        workspace_root = params.get("workspace_root", roots[0] if roots else "")
+        return self._json(soft_delete(path, roots, workspace_root=workspace_root))
+
+    def _h_restore(self, params, roots, job):
+        trash_item = params.get("trash_item_path", "")
+        restore_to = params.get("restore_to", "")
+        workspace_root = params.get("workspace_root", roots[0] if roots else "")
+        return self._json(
+            restore_from_trash(trash_item, restore_to, roots, workspace_root=workspace_root)
+        )
+
+    def _h_browse_web(self, params, roots, job):
+        return self._text(browse_web(params.get("url", "")))
+
+    def _h_create_excel(self, params, roots, job):
+        path = params.get("path", "")
+        data = _loads(params.get("data", "[]"))
+        enforce_within_roots(path, roots)
+        return self._text(_cpu_pool().apply(_run_doc_job, (CREATE_EXCEL, path, data)))
+
+    def _h_create_word(self, params, roots, job):
+        path = params.get("path", "")
+        enforce_within_roots(path, roots)
+        return self._text(
+            _cpu_pool().apply(_run_doc_job, (CREATE_WORD, path, params.get("content", "")))
+        )
+
+    def _h_create_pdf(self, params, roots, job):
+        path = params.get("path", "")
+        enforce_within_roots(path, roots)
+        return self._text(
+            _cpu_pool().apply(_run_doc_job, (CREATE_PDF, path, params.get("content", "")))
+        )
+
+    def _h_execute_python(self, params, roots, job):
+        return self._text(execute_python_code(params.get("code", "")))
+
+    def _h_search_actions(self, params, roots, job):
+        query = params.get("query", "")
+        workspace_root = params.get("workspace_root", roots[0] if roots else "")
+        return self._text(search_audit_logs(query, workspace_root))
+
+    def _h_search_drive(self, params, roots, job):
+        return self._text(search_google_drive(params.get("query", "")))
+
+    def _h_listen_meeting(self, params, roots, job):
+        duration = int(params.get("duration", 10))
+        return self._text(record_and_transcribe(duration=duration))
+
+    def _h_ai_analyze(self, params, roots, job):
+        return self._text(analyze_transcript_with_ai(params.get("transcript", "")))
 
     def _execute_job(self, job: dict) -> None:
         try:
             job_id = job["job_id"]
-            
-            params = json.loads(job["params_json"])
-            roots = json.loads(job["allowed_roots_json"])
-            jtype = int(job["type"])
-
-            if jtype == SCAN_INDEX:
-                root = params.get("root", "")
-                hash_files = params.get("hash_files", "false").lower() == "true"
-                out = scan_index(root, roots, hash_files=hash_files)
-                self.store.put_result(job_id, json.dumps(out).encode("utf-8"), "application/json")
-
-            elif jtype == LIST_FILES:
-                root = params.get("root", "")
-                out = list_files(root, roots)
-                self.store.put_result(job_id, json.dumps(out).encode("utf-8"), "application/json")
-
-            elif jtype == READ_FILE:
-                path = params.get("path", "")
-                max_bytes = int(params.get("max_bytes", "1000000"))
-                out = read_file_safe(path, roots, max_bytes=max_bytes)
-                self.store.put_result(job_id, json.dumps(out).encode("utf-8"), "application/json")
-
-            elif jtype == ORGANIZE_PLAN:
-                root = params.get("root", "")
-                policy = params.get("policy", "by_ext")
-                out = propose_organize_plan(root, roots, policy=policy)
-                self.store.put_result(job_id, json.dumps(out).encode("utf-8"), "application/json")
-
-            elif jtype == EXECUTE_PLAN:
-                plan_job_id = params.get("plan_job_id", "")
-                approval_token = (job.get("approval_token") or "").strip()
-                if not plan_job_id:
-                    raise RuntimeError("Missing plan_job_id")
-                if not approval_token:
-                    raise RuntimeError("Missing approval_token")
-
-                plan_res = self.store.get_result(plan_job_id)
-                if not plan_res:
-                    raise RuntimeError("Missing plan result")
-                plan_json = json.loads(plan_res[0].decode("utf-8"))
-
-                plan_hash = plan_json.get("plan_hash") or plan_sha256(plan_json)
-
-                if not self.store.validate_approval(approval_token, plan_job_id, plan_hash):
-                    raise RuntimeError("Invalid or expired approval token for this plan")
-
-                workspace_root = params.get("workspace_root", roots[0] if roots else "")
-                out = execute_plan(plan_json, roots, workspace_root=workspace_root)
-                self.store.put_result(job_id, json.dumps(out).encode("utf-8"), "application/json")
-
-            elif jtype == SOFT_DELETE:
-                path = params.get("path", "")
-                workspace_root = params.get("workspace_root", roots[0] if roots else "")
-                out = soft_delete(path, roots, workspace_root=workspace_root)
-                self.store.put_result(job_id, json.dumps(out).encode("utf-8"), "application/json")
-
-            elif jtype == RESTORE:
-                trash_item = params.get("trash_item_path", "")
-                restore_to = params.get("restore_to", "")
-                workspace_root = params.get("workspace_root", roots[0] if roots else "")
-                out = restore_from_trash(trash_item, restore_to, roots, workspace_root=workspace_root)
-                self.store.put_result(job_id, json.dumps(out).encode("utf-8"), "application/json")
-
-            elif jtype == BROWSE_WEB:
-                url = params.get("url", "")
-                out = browse_web(url)
-                self.store.put_result(job_id, out.encode("utf-8"), "text/plain")
-
-            elif jtype == CREATE_EXCEL:
-                path = params.get("path", "")
-                data = json.loads(params.get("data", "[]"))
-                enforce_within_roots(path, roots)
-                out = create_excel(path, data)
-                self.store.put_result(job_id, out.encode("utf-8"), "text/plain")
-
-            elif jtype == CREATE_WORD:
-                path = params.get("path", "")
-                content = params.get("content", "")
-                enforce_within_roots(path, roots)
-                out = create_word(path, content)
-                self.store.put_result(job_id, out.encode("utf-8"), "text/plain")
-
-            elif jtype == CREATE_PDF:
-                path = params.get("path", "")
-                content = params.get("content", "")
-                enforce_within_roots(path, roots)
-                out = create_pdf(path, content)
-                self.store.put_result(job_id, out.encode("utf-8"), "text/plain")
-
-            elif jtype == EXECUTE_PYTHON:
-                code = params.get("code", "")
-                out = execute_python_code(code)
-                self.store.put_result(job_id, out.encode("utf-8"), "text/plain")
-
-            elif jtype == SEARCH_ACTIONS:
-                query = params.get("query", "")
-                workspace_root = params.get("workspace_root", roots[0] if roots else "")
-                out = search_audit_logs(query, workspace_root)
-                self.store.put_result(job_id, out.encode("utf-8"), "text/plain")
-
-            elif jtype == SEARCH_DRIVE:
-                query = params.get("query", "")
-                out = search_google_drive(query)
-                self.store.put_result(job_id, out.encode("utf-8"), "text/plain")
-
-            elif jtype == LISTEN_MEETING:
-                duration = int(params.get("duration", "10"))
-                out = record_and_transcribe(duration=duration)
-                self.store.put_result(job_id, out.encode("utf-8"), "text/plain")
-
-            elif jtype == AI_ANALYZE:
-                transcript = params.get("transcript", "")
-                out = analyze_transcript_with_ai(transcript)
-                self.store.put_result(job_id, out.encode("utf-8"), "text/plain")
 
+            # Parsed once by the store when the row was claimed.
+            params = job["params"]
+            roots = job["allowed_roots"]
+            # type is INTEGER NOT NULL in the schema; sqlite3 yields int.
+            jtype = job["type"]
+
+            handler = self._handlers.get(jtype)
+            if handler is None:
+                res = self._error(f"Unsupported job type: {jtype}")
             else:
-                raise RuntimeError(f"Unsupported job type: {jtype}")
+                res = handler(params, roots, job)
 
-            self.store.complete_job(job_id, ok=True)
+            # One transaction (one fsync) for result + terminal status.
+            self.store.put_result_and_complete(
+                job_id,
+                res.payload,
+                res.content_type,
+                ok=res.ok,
+                plan_hash=res.plan_hash,
+                error_message=res.error,
+            )
 
         except Exception as e:
-            self.store.put_result(job_id, f"Error: {str(e)}".encode("utf-8"), "text/plain")
-            self.store.complete_job(job_id, ok=False, error_message=str(e))
+            self.store.put_result_and_complete(
+                job_id,
+                f"Error: {str(e)}".encode("utf-8"),
+                "text/plain",
+                ok=False,
+                error_message=str(e),
+            )